@@ -0,0 +1,64 @@
+"""Times paginator navigation over pages of 1 to 10 embeds, converting every
+page again on each visit (as before) against the memoized :class:`Page` objects.
+
+    python scripts/bench_paginator.py [rounds]
+"""
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../src"))
+
+import discord
+from utils.paginator import Paginator
+
+
+class Message:
+    """Stands in for the paginator message, so only the paginator is timed."""
+    id = 0
+
+    async def edit(self, **kwargs):
+        return self
+
+
+class ConvertingPaginator(Paginator):
+    async def get_page(self, page_number: int):
+        return self.get_page_content(self.pages[page_number])
+
+
+def build_pages(count: int, embeds: int) -> list[list[discord.Embed]]:
+    return [
+        [discord.Embed(title=f"Page {i}", description=f"Embed {j} of page {i}") for j in range(embeds)]
+        for i in range(count)
+    ]
+
+
+async def navigate(paginator_cls: type[Paginator], pages: list, rounds: int) -> float:
+    paginator = paginator_cls(pages=pages)
+    paginator.message = Message()
+    # Every page is visited once before timing, as a user paging back and forth would
+    for page_number in range(len(pages)):
+        await paginator.goto_page(page_number)
+
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for page_number in range(len(pages)):
+            await paginator.goto_page(page_number)
+            await paginator.page_action()
+    return (time.perf_counter() - start) / (rounds * len(pages))
+
+
+async def main():
+    rounds = int(sys.argv[1]) if len(sys.argv) > 1 else 2_000
+
+    print(f"{'embeds':>6}  {'converting':>12}  {'memoized':>12}")
+    for embeds in (1, 2, 5, 10):
+        pages = build_pages(10, embeds)
+        converting = await navigate(ConvertingPaginator, pages, rounds)
+        memoized = await navigate(Paginator, pages, rounds)
+        print(f"{embeds:>6}  {converting * 1e6:>9.1f} us  {memoized * 1e6:>9.1f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
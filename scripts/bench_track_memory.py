@@ -0,0 +1,84 @@
+"""Compares the memory held by 100k queued tracks in the old representation
+(a dataclass holding a full ``wavelink.YouTubeTrack``) against the compact
+slotted :class:`Track`.
+
+    python scripts/bench_track_memory.py [count]
+"""
+import base64
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "../src"))
+
+import wavelink
+from cogs.music.utils import Track
+
+
+@dataclass
+class LegacyTrack:
+    title: str
+    url: str
+    thumbnail: str
+    wavelink: wavelink.YouTubeTrack
+
+
+def lavalink_payload(i: int) -> tuple[str, dict]:
+    identifier = f"{i:011d}"
+    info = {
+        "identifier": identifier,
+        "isSeekable": True,
+        "author": f"Artist {i}",
+        "length": 215000 + i % 60000,
+        "isStream": False,
+        "position": 0,
+        "title": f"Artist {i} - Some Song Title (Official Music Video) {i}",
+        "uri": f"https://www.youtube.com/watch?v={identifier}",
+        "sourceName": "youtube",
+    }
+    encoded = base64.b64encode(os.urandom(160)).decode()
+    return encoded, info
+
+
+def measure(build, payloads) -> int:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    tracks = [build(encoded, info) for encoded, info in payloads]
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del tracks
+    return size
+
+
+def legacy(encoded: str, info: dict) -> LegacyTrack:
+    # Lavalink responses are decoded per track, so each one owns its info dict
+    wave = wavelink.YouTubeTrack(id=encoded, info=dict(info))
+    return LegacyTrack(
+        title=wave.title,
+        url=wave.uri,
+        thumbnail=wave.thumbnail,
+        wavelink=wave,
+    )
+
+
+def compact(encoded: str, info: dict) -> Track:
+    wave = wavelink.YouTubeTrack(id=encoded, info=dict(info))
+    return Track.from_wavelink(wave)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    payloads = [lavalink_payload(i) for i in range(count)]
+
+    legacy_size = measure(legacy, payloads)
+    compact_size = measure(compact, payloads)
+
+    print(f"tracks:  {count:,}")
+    print(f"legacy:  {legacy_size / 2**20:8.1f} MiB ({legacy_size / count:,.0f} B/track)")
+    print(f"compact: {compact_size / 2**20:8.1f} MiB ({compact_size / count:,.0f} B/track)")
+    print(f"saved:   {1 - compact_size / legacy_size:8.1%}")
+
+
+if __name__ == "__main__":
+    main()
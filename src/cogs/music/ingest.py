@@ -0,0 +1,95 @@
+import time
+from typing import AsyncIterator, Awaitable, Callable
+import discord
+
+from .utils import Track, YouTubeTrackList, SpotifyTrackList
+from .pipeline import ResolvePipeline
+
+from utils.formatter import TextFormatter as fmt
+from utils.scheduler import EditScheduler
+import config
+
+
+class Ingestion:
+    """A tracklist being added to a player in the background.
+
+    The first track is queued, and playback started, as soon as it arrives;
+    ``on_started`` runs whenever adding a batch started playback.
+    The rest follow in batches of ``config.INGEST_BATCH_SIZE`` tracks or
+    whatever arrived within ``config.INGEST_BATCH_INTERVAL`` seconds. The
+    announcement message keeps a count of the tracks queued so far.
+    """
+    def __init__(
+        self,
+        player,
+        source: AsyncIterator[Track],
+        tracklist: YouTubeTrackList | SpotifyTrackList,
+        title: str,
+        on_started: Callable[[], Awaitable[None]]
+    ) -> None:
+        self.player = player
+        self.source = source
+        self.tracklist = tracklist
+        self.title = title
+        self.on_started = on_started
+        self.queued = 0
+        self.finished = False
+        self.cancelled = False
+        self.editor = EditScheduler(self.render, interval=config.BOARD_EDIT_INTERVAL)
+
+    def render(self) -> dict:
+        if self.cancelled:
+            footer = f"Stopped after {self.queued} tracks"
+        elif self.finished:
+            footer = f"{self.queued} tracks queued"
+        else:
+            footer = f"{self.queued} tracks queued, loading more..."
+
+        if isinstance(self.source, ResolvePipeline) and self.source.failed:
+            footer += f" ({self.source.failed} not found on YouTube yet)"
+
+        return {
+            "embed": discord.Embed(
+                title=self.title,
+                description=f"{fmt.hyperlink(self.tracklist.name, self.tracklist.url)}"
+            ).set_thumbnail(url=self.tracklist.thumbnail).set_footer(text=footer)
+        }
+
+    async def announce(self, interaction: discord.Interaction):
+        payload = self.render()
+        self.editor.sent(await interaction.followup.send(wait=True, **payload), payload)
+
+    async def run(self):
+        batch = []
+        flushed_at = time.monotonic()
+        try:
+            async for track in self.source:
+                batch.append(track)
+                if (
+                    self.queued == 0
+                    or len(batch) >= config.INGEST_BATCH_SIZE
+                    or time.monotonic() - flushed_at >= config.INGEST_BATCH_INTERVAL
+                ):
+                    await self.flush(batch)
+                    batch = []
+                    flushed_at = time.monotonic()
+
+            await self.flush(batch)
+            self.finished = True
+        finally:
+            self.editor.request()
+
+    async def flush(self, batch: list[Track]):
+        if not batch:
+            return
+
+        started = await self.player.extend(batch)
+        self.queued += len(batch)
+        self.editor.request()
+
+        if started:
+            await self.on_started()
+
+    def cancel(self):
+        self.cancelled = True
+        self.editor.request()
@@ -5,13 +5,17 @@ from discord.ext.commands import Bot, Cog
 
 import wavelink
 
-from .utils import Track
-from .player import Player, PlayerManager, PlayerLoopState
+from .utils import Track, SpotifyTrackList
+from .player import Player, PlayerBoard, PlayerManager, PlayerLoopState
 from .search import YouTubeSearch, SpotifySearch
+from .router import router
+from .pipeline import ResolvePipeline
+from .ingest import Ingestion
+from .pages import QueuePageSource
 
 from utils.formatter import TextFormatter as fmt
-from utils.paginator import Paginator
 from main import logger
+import config
 
 class Music(Cog):
     def __init__(self, bot: Bot) -> None:
@@ -26,9 +30,13 @@ class Music(Cog):
     async def on_wavelink_node_ready(self, node: wavelink.Node):
         logger.info(f'[NODE] {node.identifier} connected.')  
 
+    @Cog.listener("on_wavelink_track_start")
+    async def on_player_start(self, player: Player, *args, **kwargs):
+        player.track_started()
+
     @Cog.listener("on_wavelink_track_end")
-    async def on_player_stop(self, player: Player, *args, **kwargs):
-        await player.advance()
+    async def on_player_stop(self, player: Player, track: wavelink.Track, reason: str, *args, **kwargs):
+        await player.on_track_end(reason)
 
     @Cog.listener()
     async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState) -> None:
@@ -45,6 +53,32 @@ class Music(Cog):
                     await guild.voice_client.disconnect()
         except: pass
 
+    @Cog.listener()
+    async def on_interaction(self, interaction: discord.Interaction):
+        """Handles clicks on board and queue buttons. Their custom_id names the
+        kind of message and the guild, so no view has to be kept per message."""
+        if interaction.type != discord.InteractionType.component or interaction.guild is None:
+            return
+
+        parts = interaction.data.get("custom_id", "").split(":", 3)
+        if len(parts) != 4 or parts[2] != str(interaction.guild.id):
+            return
+
+        kind = f"{parts[0]}:{parts[1]}"
+        if kind not in (PlayerBoard.CUSTOM_ID, QueuePageSource.CUSTOM_ID):
+            return
+
+        player = await self.manager.get_player(interaction.guild)
+        if player is None:
+            await interaction.response.send_message('I am not connected to any channel.', ephemeral=True)
+            return
+
+        if kind == PlayerBoard.CUSTOM_ID:
+            await interaction.response.defer()
+            await player.press(parts[3], interaction.message)
+        else:
+            await QueuePageSource.dispatch(player, interaction)
+
     async def check_interaction(self, interaction: discord.Interaction):
         user = interaction.user
         player = await self.manager.get_player(interaction.guild)
@@ -128,8 +162,14 @@ class Music(Cog):
 
             await msg.delete()
 
+    async def ingest_tracklist(self, interaction: discord.Interaction, player: Player, tracklist, source, title: str, show_board):
+        """Announces a tracklist and leaves queueing it to a background job of the player."""
+        ingestion = Ingestion(player, source, tracklist, title, on_started=show_board)
+        await ingestion.announce(interaction)
+        player.ingest(ingestion)
+
     @group.command(name="play", description="Play a song from query that you provided.")
-    @app_commands.describe(query="YouTube url or keyword to search on YouTube")
+    @app_commands.describe(query="YouTube, Spotify, SoundCloud or audio url, or keywords to search on YouTube")
     async def play_command(self, interaction: discord.Interaction, query: str):
         if interaction.user.voice is None:
             await interaction.response.send_message("You are not connected to any voice channel.")
@@ -142,87 +182,49 @@ class Music(Cog):
             channel=interaction.user.voice.channel
         )
 
-        async def play():
-            if not player.is_playing():
-                await player.advance()
-
+        async def show_board():
             if player.board is None:
                 await player.create_player_board(interaction)
             else:
                 await player.delete_player_board()
                 await player.create_player_board(interaction)
 
-        # Youtube Search
-        if "open.spotify.com" not in query:
-            if "youtube.com" in query or "youtu.be" in query:
-                if "list=" in query:
-                    tracklist = await YouTubeSearch.playlist(query)
-                    await interaction.response.send_message(
-                        embed=discord.Embed(
-                            title="Playlist added",
-                            description=f"{fmt.hyperlink(tracklist.name, tracklist.url)}"
-                        ).set_thumbnail(url=tracklist.thumbnail)
-                    )
+        route = router.route(query)
+        if route is None:
+            track = await self.choose_track(interaction, query)
+            if track is None:
+                return
 
-                    async for track in tracklist.iterator():
-                        player.queue.add(YouTubeSearch.get_track(track))
-                        if not player.is_playing():
-                            await play()
-                    
-                else:
-                    track = await YouTubeSearch.video(query)
-                    await interaction.response.send_message(
-                        embed=discord.Embed(
-                            title="Song Added",
-                            description=f"{fmt.hyperlink(track.title, track.url)}"
-                        ).set_thumbnail(url=track.thumbnail)
-                    )
-                    player.queue.add(track)
-                    await play()
-
-            else:
-                track = await self.choose_track(interaction, query)
-                player.queue.add(track)
-                await play()
+            if await player.extend([track]):
+                await show_board()
+            return
 
-        # Spotify Search
-        else:
-            if "track" in query:
-                track = await SpotifySearch.track(query)
-                await interaction.response.send_message(
-                    embed=discord.Embed(
-                        title="Song added",
-                        description=f"{fmt.hyperlink(track.title, track.url)}"
-                    ).set_thumbnail(url=track.thumbnail)
-                )
+        try:
+            result = await route.load()
+        except Exception as e:
+            logger.error(e)
+            result = None
 
-            if "album" in query:
-                tracklist = await SpotifySearch.album(query)
-                await interaction.followup.send(
-                    embed=discord.Embed(
-                        title="Album added",
-                        description=f"{fmt.hyperlink(tracklist.name, tracklist.url)}"
-                    ).set_thumbnail(url=tracklist.thumbnail)
-                )
+        if result is None:
+            await interaction.followup.send("Couldn't load anything from that link.")
+            return
 
-                async for track in tracklist.iterator():
-                    player.queue.add(YouTubeSearch.get_track(track))
-                    if not player.is_playing():
-                        await play()
-
-            if "playlist" in query:
-                tracklist = await SpotifySearch.playlist(query)
-                await interaction.followup.send(
-                    embed=discord.Embed(
-                        title="Playlist added",
-                        description=f"{fmt.hyperlink(tracklist.name, tracklist.url)}"
-                    ).set_thumbnail(url=tracklist.thumbnail)
-                )
+        if isinstance(result, Track):
+            await interaction.followup.send(
+                embed=discord.Embed(
+                    title=route.resolver.title,
+                    description=f"{fmt.hyperlink(result.title, result.url)}"
+                ).set_thumbnail(url=result.thumbnail)
+            )
+            if await player.extend([result]):
+                await show_board()
+            return
 
-                async for track in tracklist.iterator():
-                    player.queue.add(YouTubeSearch.get_track(track))
-                    if not player.is_playing():
-                        await play()
+        if isinstance(result, SpotifyTrackList):
+            source = ResolvePipeline(result.iterator(), config.SPOTIFY_RESOLVE_CONCURRENCY)
+        else:
+            source = result.iterator()
+        await self.ingest_tracklist(interaction, player, result, source, route.resolver.title, show_board)
 
     @group.command(name="pause", description="Pause the currently playing player")
     async def pause_command(self, interaction: discord.Interaction):
@@ -255,7 +257,7 @@ class Music(Cog):
             return
         
         player = await self.manager.get_player(interaction.guild)
-        if len(player.queue.upcoming) <= 0:
+        if not player.queue.has_next:
             await interaction.response.send_message("There is no next track")
         else:
             await player.next()
@@ -267,7 +269,7 @@ class Music(Cog):
             return
         
         player = await self.manager.get_player(interaction.guild)
-        if len(player.queue.past) <= 1:
+        if not player.queue.has_previous:
             await interaction.response.send_message("There is no previous track")
         else:
             await player.previous()
@@ -279,12 +281,70 @@ class Music(Cog):
             return
         
         player = await self.manager.get_player(interaction.guild)
-        if len(player.queue.upcoming) <= 0:
+        if player.queue.upcoming_count <= 0:
             await interaction.response.send_message("There is no song in queue")
         else:
             await player.shuffle()
             await interaction.response.send_message("Queue shuffled")
 
+    @group.command(name="unshuffle", description="Restore the original queue order")
+    async def unshuffle_command(self, interaction: discord.Interaction):
+        if not await self.check_interaction(interaction):
+            return
+        
+        player = await self.manager.get_player(interaction.guild)
+        if not player.queue.shuffled:
+            await interaction.response.send_message("Queue is not shuffled")
+        else:
+            await player.unshuffle()
+            await interaction.response.send_message("Queue order restored")
+
+    @group.command(name="remove", description="Remove a song from the queue")
+    @app_commands.describe(position="Position of the song in the queue")
+    async def remove_command(self, interaction: discord.Interaction, position: app_commands.Range[int, 1]):
+        if not await self.check_interaction(interaction):
+            return
+        
+        player = await self.manager.get_player(interaction.guild)
+        track = player.queue.remove(position-1)
+        if track is None:
+            await interaction.response.send_message(f"There is no song at position {position}")
+        else:
+            await interaction.response.send_message(
+                embed=discord.Embed(
+                    title="Song removed",
+                    description=f"{fmt.hyperlink(track.title, track.url)}"
+                ).set_thumbnail(url=track.thumbnail)
+            )
+
+    @group.command(name="move", description="Move a song to another position in the queue")
+    @app_commands.describe(source="Position of the song to move", destination="Position to move the song to")
+    async def move_command(self, interaction: discord.Interaction, source: app_commands.Range[int, 1], destination: app_commands.Range[int, 1]):
+        if not await self.check_interaction(interaction):
+            return
+        
+        player = await self.manager.get_player(interaction.guild)
+        track = player.queue.move(source-1, destination-1)
+        if track is None:
+            await interaction.response.send_message(f"There is no song at position {source}")
+        else:
+            await interaction.response.send_message(
+                f"Moved {fmt.hyperlink(track.title, track.url)} to position {min(destination, player.queue.upcoming_count)}"
+            )
+
+    @group.command(name="skipto", description="Skip to a song in the queue")
+    @app_commands.describe(position="Position of the song in the queue")
+    async def skipto_command(self, interaction: discord.Interaction, position: app_commands.Range[int, 1]):
+        if not await self.check_interaction(interaction):
+            return
+        
+        player = await self.manager.get_player(interaction.guild)
+        if position > player.queue.upcoming_count:
+            await interaction.response.send_message(f"There is no song at position {position}")
+        else:
+            await player.skip_to(position-1)
+            await interaction.response.send_message(f"Skipped to song {position}")
+
     @group.command(name="loop", description="Toggle queue loop")
     @app_commands.describe(loop="Off: Disable loop queue | All: Loop the entire queue | One: Loop only the current song")
     @app_commands.choices(loop=[
@@ -298,13 +358,13 @@ class Music(Cog):
         
         player = await self.manager.get_player(interaction.guild)
         if loop.value == 0:
-            player.loop_state = PlayerLoopState.NONE
+            player.set_loop(PlayerLoopState.NONE)
             await interaction.response.send_message("Queue loop set to off")
         if loop.value == 1:
-            player.loop_state = PlayerLoopState.ALL
+            player.set_loop(PlayerLoopState.ALL)
             await interaction.response.send_message("Queue loop set to loop all")
         if loop.value == 2:
-            player.loop_state = PlayerLoopState.ONE
+            player.set_loop(PlayerLoopState.ONE)
             await interaction.response.send_message("Queue loop set to loop current song")
 
     @group.command(name="stop", description="Stop the player and clear existing queue")
@@ -313,8 +373,9 @@ class Music(Cog):
             return
         
         player = await self.manager.get_player(interaction.guild)
+        player.cancel_ingestions()
         await player.stop()
-        player.queue.upcoming = []
+        player.queue.clear_upcoming()
         await interaction.response.send_message("Player stopped and queue cleared.")
 
     @group.command(name="queue", description="Show current queue")
@@ -323,68 +384,10 @@ class Music(Cog):
             return
         
         player = await self.manager.get_player(interaction.guild)
-        embed=discord.Embed(title="Queue")
-        embed.set_thumbnail(url=player.current.thumbnail)
-        embed.add_field(
-            name="Currently playing",
-            value=f"{fmt.hyperlink(player.current.title, player.current.url)}",
-            inline=False
-        )
-
-        if len(player.queue.upcoming) <= 0:
-            embed.add_field(
-                name="Upcoming",
-                value=f"`empty`",
-                inline=False
-            )
-            await interaction.response.send_message(embed=embed)
-
-        elif 0 < len(player.queue.upcoming) <= 10:
-            page = ""
-            for i, track in enumerate(player.queue.upcoming, 1):
-                track: Track
-                page += f"`{i}.` {fmt.hyperlink(fmt.shorten(track.title), track.url)}\r"
-
-            embed.add_field(
-                name="Upcoming",
-                value=page,
-                inline=False
-            )
-            await interaction.response.send_message(embed=embed)
-
-        elif len(player.queue.upcoming) > 10:
-            sliced_queue, queue = [], player.queue.upcoming
-            while len(queue) > 10:
-                piece = queue[:10]
-                queue = queue[10:]
-
-                sliced_queue.append(piece)
-            sliced_queue.append(queue)
-
-            pos, pages = 1, []
-            for piece in sliced_queue:
-                page = ""
-                for item in piece:
-                    page += f'`{pos}.` {fmt.hyperlink(fmt.shorten(item.title), item.url)}\n'
-                    pos += 1
-                
-                embed=discord.Embed(title="Queue")
-                embed.set_thumbnail(url=player.current.thumbnail)
-                embed.add_field(
-                    name="Currently playing",
-                    value=f"{fmt.hyperlink(player.current.title, player.current.url)}",
-                    inline=False
-                )
-                embed.add_field(
-                    name="Upcoming",
-                    value=page,
-                    inline=False
-                )
-
-                pages.append(embed)
-
-            paginator = Paginator(pages=pages)
-            await paginator.respond(interaction)
+        source = QueuePageSource(player)
+        paginator = source.create_paginator()
+        await paginator.respond(interaction)
+        source.watch(paginator)
 
     @group.command(name="board", description="Show current player board")
     async def board_command(self, interaction: discord.Interaction):
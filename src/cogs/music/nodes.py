@@ -0,0 +1,167 @@
+import time
+import asyncio
+from collections import deque
+from typing import Awaitable, Callable
+import aiohttp
+import wavelink
+from discord.ext.commands import Bot
+
+from .spotifyapi import SpotifyAPI
+
+from utils.logger import logger
+import config
+
+
+class NodeHealth:
+    """What we know about a Lavalink node besides what it reports in its stats."""
+    # Weight of a new latency sample in the moving average
+    SMOOTHING = 0.3
+    # Lavalink sends stats every minute, players placed since then are not in them yet
+    STATS_INTERVAL = 60
+
+    def __init__(self, identifier: str, options: dict) -> None:
+        self.identifier = identifier
+        self.options = options
+        self.latency: float | None = None
+        self.failures = 0
+        self.assignments: deque[float] = deque()
+
+    @property
+    def recent_assignments(self) -> int:
+        cutoff = time.monotonic() - self.STATS_INTERVAL
+        while self.assignments and self.assignments[0] < cutoff:
+            self.assignments.popleft()
+        return len(self.assignments)
+
+    def assign(self):
+        self.assignments.append(time.monotonic())
+
+    @property
+    def rest_uri(self) -> str:
+        scheme = "https" if self.options.get("https") else "http"
+        return f"{scheme}://{self.options['host']}:{self.options['port']}"
+
+    def record(self, latency: float):
+        self.failures = 0
+        if self.latency is None:
+            self.latency = latency
+        else:
+            self.latency += self.SMOOTHING * (latency - self.latency)
+
+
+class NodeBalancer:
+    """Connects all configured Lavalink nodes and picks the least loaded one.
+
+    The penalty is wavelink's own ``Node.penalty`` (playing players, CPU
+    load, nulled and missing frames), or the connected players of a node
+    that has not reported stats yet, plus the measured REST
+    latency and the players placed on the node within the last stats
+    interval, which its stats cannot show yet.
+
+    A node that disconnects or misses ``config.NODE_MAX_FAILURES`` pings in a
+    row is reported once through ``on_node_down``.
+    """
+    def __init__(
+        self,
+        bot: Bot,
+        session: aiohttp.ClientSession,
+        on_node_down: Callable[[wavelink.Node], Awaitable[None]] | None = None
+    ) -> None:
+        self.bot = bot
+        self.session = session
+        self.on_node_down = on_node_down
+        self.health: dict[str, NodeHealth] = {}
+        self.down: set[str] = set()
+
+    async def connect_all(self, nodes: list[dict]):
+        await asyncio.gather(*(self.connect(options) for options in nodes))
+
+    async def connect(self, options: dict):
+        identifier = options["identifier"]
+        self.health[identifier] = NodeHealth(identifier, options)
+        try:
+            await wavelink.NodePool.create_node(
+                bot=self.bot,
+                spotify_client=await SpotifyAPI.wavelink_client(),
+                **options
+            )
+        except Exception as e:
+            logger.error(f"[NODE] {identifier} failed to connect: {e}")
+            return
+
+        await self.probe(identifier)
+
+    async def probe(self, identifier: str) -> bool:
+        """Measures the REST round trip of a node. Returns whether it answered."""
+        health = self.health[identifier]
+        started = time.perf_counter()
+        try:
+            async with self.session.get(
+                f"{health.rest_uri}/version",
+                headers={"Authorization": health.options["password"]},
+                timeout=aiohttp.ClientTimeout(total=config.NODE_PROBE_TIMEOUT),
+            ) as response:
+                response.raise_for_status()
+        except Exception:
+            health.failures += 1
+            return False
+
+        health.record(time.perf_counter() - started)
+        return True
+
+    async def probe_loop(self):
+        while not self.bot.is_closed():
+            await asyncio.sleep(config.NODE_PROBE_INTERVAL)
+            await asyncio.gather(*(self.probe(identifier) for identifier in self.health))
+            await self.check_nodes()
+
+    async def check_nodes(self):
+        for node in list(wavelink.NodePool._nodes.values()):
+            if self.is_available(node):
+                if node.identifier in self.down:
+                    self.down.discard(node.identifier)
+                    logger.info(f"[NODE] {node.identifier} is back.")
+                continue
+
+            if node.identifier in self.down:
+                continue
+
+            self.down.add(node.identifier)
+            logger.warning(f"[NODE] {node.identifier} is down.")
+            if self.on_node_down is not None:
+                self.bot.loop.create_task(self.on_node_down(node))
+
+    @staticmethod
+    def stats_penalty(node: wavelink.Node) -> float:
+        # wavelink's Node.penalty is 9e30 until the node reports stats, which
+        # would hide the other terms, so count its connected players instead
+        if node.stats is None:
+            return len(node.players)
+        return node.penalty
+
+    def penalty(self, node: wavelink.Node) -> float:
+        health = self.health.get(node.identifier)
+        if health is None:
+            return self.stats_penalty(node)
+
+        latency = health.latency if health.latency is not None else 0.0
+        # 10 ms of latency weighs like one playing player
+        return self.stats_penalty(node) + health.recent_assignments + latency * 100
+
+    def is_available(self, node: wavelink.Node) -> bool:
+        health = self.health.get(node.identifier)
+        return node.is_connected() and (health is None or health.failures < config.NODE_MAX_FAILURES)
+
+    def best_node(self, exclude: tuple = ()) -> wavelink.Node | None:
+        """Returns the available node with the lowest penalty and counts a player on it."""
+        nodes = [
+            node for node in wavelink.NodePool._nodes.values()
+            if node not in exclude and self.is_available(node)
+        ]
+        if not nodes:
+            return None
+
+        node = min(nodes, key=self.penalty)
+        if node.identifier in self.health:
+            self.health[node.identifier].assign()
+        return node
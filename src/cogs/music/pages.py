@@ -0,0 +1,132 @@
+import math
+import asyncio
+import discord
+
+from utils.formatter import TextFormatter as fmt
+from utils.paginator import Paginator
+from utils.logger import logger
+import config
+
+
+class QueuePageSource:
+    """Pages of a player's upcoming tracks, bound to the live queue.
+
+    Each page is built from only the tracks it shows. Its key is the current
+    track plus the tracks in its slice, so a page is rendered again only when
+    what it shows changed; while the queue version, the cursor and the current
+    track stay the same even the slice is not looked at. A paginator passed to
+    :meth:`watch` is refreshed whenever the queue changes.
+
+    Queue paginators are stateless: their buttons carry the guild and the page
+    they lead to, and :meth:`dispatch` rebuilds whatever is needed to show it.
+    """
+    CUSTOM_ID = "pinkdot:queue"
+    # Sources refreshing a queue message, by message id
+    watching: dict[int, "QueuePageSource"] = {}
+
+    def __init__(self, player, per_page: int = 10) -> None:
+        self.player = player
+        self.per_page = per_page
+        self.keys: dict[int, tuple[tuple, tuple]] = {}
+        self.paginator: Paginator | None = None
+        self.refresh_task: asyncio.Task | None = None
+        self.expiry: asyncio.TimerHandle | None = None
+
+    def create_paginator(self) -> Paginator:
+        return Paginator(pages=self, custom_id_prefix=f"{self.CUSTOM_ID}:{self.player.guild.id}")
+
+    @classmethod
+    async def dispatch(cls, player, interaction: discord.Interaction):
+        """Shows the page a queue button leads to on the message it was clicked on."""
+        source = cls.watching.get(interaction.message.id)
+        if source is None or source.player is not player or source.paginator is None:
+            source = cls(player)
+            source.paginator = source.create_paginator()
+
+        if await source.paginator.dispatch(interaction):
+            source.watch(source.paginator)
+
+    def get_page_count(self) -> int:
+        return max(math.ceil(self.player.queue.upcoming_count / self.per_page), 1)
+
+    def get_page_key(self, page_number: int) -> tuple:
+        queue = self.player.queue
+        state = (queue.version, queue.cursor, id(self.player.current))
+        known = self.keys.get(page_number)
+        if known is not None and known[0] == state:
+            return known[1]
+
+        start = page_number * self.per_page
+        key = (
+            id(self.player.current),
+            tuple((id(track), track.title) for track in queue.upcoming(start, start + self.per_page)),
+        )
+        self.keys[page_number] = (state, key)
+        return key
+
+    async def get_page(self, page_number: int) -> discord.Embed:
+        start = page_number * self.per_page
+        tracks = self.player.queue.upcoming(start, start + self.per_page)
+        return self.render(tracks, start)
+
+    def render(self, tracks: list, start: int) -> discord.Embed:
+        current = self.player.current
+        embed = discord.Embed(title="Queue")
+        if current is not None:
+            embed.set_thumbnail(url=current.thumbnail)
+            embed.add_field(
+                name="Currently playing",
+                value=f"{fmt.hyperlink(current.title, current.url)}",
+                inline=False
+            )
+
+        page = ""
+        for i, track in enumerate(tracks, start + 1):
+            page += f"`{i}.` {fmt.hyperlink(fmt.shorten(track.title), track.url)}\n"
+
+        embed.add_field(
+            name="Upcoming",
+            value=page or "`empty`",
+            inline=False
+        )
+        return embed
+
+    def watch(self, paginator: Paginator):
+        """Refreshes ``paginator`` on queue changes until ``config.QUEUE_WATCH_TIMEOUT``
+        seconds after the last call."""
+        self.paginator = paginator
+        if self.on_queue_change not in self.player.queue.listeners:
+            self.player.queue.listeners.append(self.on_queue_change)
+        QueuePageSource.watching[paginator.message.id] = self
+
+        if self.expiry is not None:
+            self.expiry.cancel()
+        self.expiry = asyncio.get_running_loop().call_later(config.QUEUE_WATCH_TIMEOUT, self.unwatch)
+
+    def unwatch(self):
+        if self.on_queue_change in self.player.queue.listeners:
+            self.player.queue.listeners.remove(self.on_queue_change)
+        if self.expiry is not None:
+            self.expiry.cancel()
+            self.expiry = None
+        if self.paginator is not None and QueuePageSource.watching.get(self.paginator.message.id) is self:
+            del QueuePageSource.watching[self.paginator.message.id]
+        self.paginator = None
+
+    def on_queue_change(self, queue):
+        if self.paginator is None:
+            self.unwatch()
+            return
+
+        if self.refresh_task is None or self.refresh_task.done():
+            self.refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+
+    async def refresh(self):
+        # Changes that arrive while waiting are shown by the same refresh
+        await asyncio.sleep(config.BOARD_EDIT_INTERVAL)
+        if self.paginator is None:
+            return
+        try:
+            await self.paginator.refresh()
+        except Exception as e:
+            logger.error(e)
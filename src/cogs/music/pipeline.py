@@ -0,0 +1,56 @@
+import asyncio
+from collections import deque
+from typing import AsyncIterator
+
+from .utils import Track
+from .search import YouTubeSearch
+
+
+class ResolvePipeline:
+    """Resolves tracks from ``source`` on YouTube with at most ``limit``
+    lookups in flight and yields them in source order as soon as every
+    track before them is done.
+
+    Tracks that could not be resolved are still yielded, unresolved, so the
+    order is kept and the player can retry them when they come up. At most
+    ``window`` tracks are read ahead of the first unfinished one.
+    """
+    def __init__(self, source: AsyncIterator[Track], limit: int, window: int | None = None) -> None:
+        self.source = source
+        self.limit = limit
+        self.window = window or limit * 4
+        self.read = 0
+        self.resolved = 0
+        self.failed = 0
+        self.yielded = 0
+
+    async def __aiter__(self):
+        semaphore = asyncio.Semaphore(self.limit)
+        pending: deque[tuple[Track, asyncio.Task]] = deque()
+
+        async def resolve(track: Track) -> bool:
+            if track.resolved:
+                return True
+            async with semaphore:
+                return await YouTubeSearch.resolve(track)
+
+        try:
+            async for track in self.source:
+                self.read += 1
+                pending.append((track, asyncio.create_task(resolve(track))))
+                while pending and (pending[0][1].done() or len(pending) >= self.window):
+                    yield await self.finish(*pending.popleft())
+
+            while pending:
+                yield await self.finish(*pending.popleft())
+        finally:
+            for _, task in pending:
+                task.cancel()
+
+    async def finish(self, track: Track, task: asyncio.Task) -> Track:
+        if await task:
+            self.resolved += 1
+        else:
+            self.failed += 1
+        self.yielded += 1
+        return track
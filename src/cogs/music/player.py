@@ -1,17 +1,27 @@
 from enum import Enum
 import os
 import json
-import random
-from typing import Optional
+import time
+import asyncio
+import functools
+from collections import deque
+from typing import Callable, Optional
 import discord
 from discord.ext.commands import Bot
 
+from utils.chunkedlist import ChunkedList
+from utils.http import HTTP
 from utils.formatter import Emoji, TextFormatter as fmt
+from utils.scheduler import EditScheduler
+from utils.shuffle import LazyShuffle
 from .utils import Track
+from .search import YouTubeSearch
+from .snapshot import PlayerSnapshot, PlayerSnapshotStore, TrackChanges
+from .nodes import NodeBalancer
+from .ingest import Ingestion
 from main import logger
 import config
 import wavelink
-from wavelink.ext import spotify
 
 
 class PlayerLoopState(Enum):
@@ -20,6 +30,24 @@ class PlayerLoopState(Enum):
     ONE = "one"
 
 
+class PlayerState(Enum):
+    IDLE = "idle"
+    LOADING = "loading"
+    PLAYING = "playing"
+    STOPPED = "stopped"
+
+
+class TrackEndReason:
+    FINISHED = "FINISHED"
+    LOAD_FAILED = "LOAD_FAILED"
+    STOPPED = "STOPPED"
+    REPLACED = "REPLACED"
+    CLEANUP = "CLEANUP"
+
+    # Reasons after which the player should move on to the next track
+    ADVANCE = (FINISHED, LOAD_FAILED)
+
+
 class PlayerButton(discord.ui.Button):
     def __init__(
         self, 
@@ -40,43 +68,26 @@ class PlayerButton(discord.ui.Button):
             row=row
         )
         self.button_type: str = button_type
-        self.player: Player = None
-
-
-    async def callback(self, interaction: discord.Interaction):
-        await interaction.response.defer()
-
-        if self.button_type == "next":
-            await self.player.next()
-
-        if self.button_type == "previous":
-            await self.player.previous()
-
-        if self.button_type == "pause":
-            if self.player.is_paused():
-                await self.player.resume()
-            else:
-                await self.player.pause()
-
-        if self.button_type == "shuffle":
-            await self.player.shuffle()
-        
-        if self.button_type == "loop":
-            await self.player.loop()
-
-        await self.player.board.update()
 
 
 class PlayerBoard(discord.ui.View):
+    """The player's now playing message. Its buttons are not bound to this view:
+    their custom_id is ``pinkdot:board:<guild id>:<button type>`` and clicks are
+    handled by :meth:`Player.press`, so they keep working after a restart."""
+    CUSTOM_ID = "pinkdot:board"
+
     def __init__(
         self, 
         player, 
         timeout: float = None
     ):
         super().__init__(timeout=timeout)
+        # A finished view is not stored by discord.py when it is sent
+        self.stop()
         self.buttons = {}
         self.player: Player = player
         self.message: discord.Message | discord.InteractionMessage = None
+        self.editor = EditScheduler(self.render, interval=config.BOARD_EDIT_INTERVAL)
 
         self.add_buttons()
 
@@ -104,8 +115,8 @@ class PlayerBoard(discord.ui.View):
             ),            
         ]
         for b in buttons:
+            b.custom_id = f"{self.CUSTOM_ID}:{self.player.guild.id}:{b.button_type}"
             self.buttons[b.button_type] = b
-            b.player = self.player
 
     def update_buttons(self):
         self.clear_items()
@@ -118,14 +129,31 @@ class PlayerBoard(discord.ui.View):
                 else:
                     button.emoji = Emoji.pause
 
+            if key == "shuffle":
+                if self.player.queue.shuffled:
+                    button.style = discord.ButtonStyle.blurple
+                else:
+                    button.style = discord.ButtonStyle.grey
+
+            if key == "loop":
+                if self.player.loop_state == PlayerLoopState.ONE:
+                    button.emoji = Emoji.loop_cur
+                else:
+                    button.emoji = Emoji.loop_all
+
+                if self.player.loop_state == PlayerLoopState.NONE:
+                    button.style = discord.ButtonStyle.grey
+                else:
+                    button.style = discord.ButtonStyle.blurple
+
             # if key == "next":
-            #     if len(self.player.queue.upcoming) <= 0:
+            #     if self.player.queue.upcoming_count <= 0:
             #         button.disabled = True
             #     else:
             #         button.disabled = False
 
             # if key == "previous":
-            #     if len(self.player.queue.past) <= 1:
+            #     if self.player.queue.history_count <= 0:
             #         button.disabled = True
             #     else:
             #         button.disabled = False
@@ -139,28 +167,27 @@ class PlayerBoard(discord.ui.View):
         ).set_thumbnail(url=self.player.current.thumbnail)
     
 
+    def render(self) -> dict:
+        self.update_buttons()
+        return {"embed": self.get_embed(), "view": self}
+
     async def update(self):
+        """Schedules a board refresh. Bursts of updates are merged into one edit."""
         if self.message is None:
             return
 
-        self.update_buttons()
-
-        await self.message.edit(
-                embed=self.get_embed(),
-                view=self,
-        )
+        self.editor.request()
 
 
-    async def respond(self, interaction: discord.Interaction, ephemeral: bool = False):
-        self.update_buttons()
+    async def respond(self, interaction: discord.Interaction | discord.abc.Messageable, ephemeral: bool = False):
+        payload = self.render()
 
         if isinstance(interaction, discord.Interaction):
             self.user = interaction.user
 
             if interaction.response.is_done():
                 msg: discord.WebhookMessage = await interaction.followup.send(
-                    embed=self.get_embed(),
-                    view=self,
+                    **payload,
                     ephemeral=ephemeral
                 )
                 # convert from WebhookMessage to Message reference to bypass
@@ -169,111 +196,555 @@ class PlayerBoard(discord.ui.View):
                     msg = await msg.channel.fetch_message(msg.id)
             else:
                 msg: discord.WebhookMessage = await interaction.followup.send(
-                    embed=self.get_embed(),
-                    view=self,
+                    **payload,
                     ephemeral=ephemeral
                 )
+        else:
+            msg = await interaction.send(**payload)
 
         self.message = msg
+        self.editor.sent(msg, payload)
 
     async def edit(self, message: discord.Message | discord.WebhookMessage | discord.InteractionMessage, ephemeral: bool = False):
-        self.update_buttons()
+        payload = self.render()
         
         msg = await message.edit(
-                embed=self.get_embed(),
-                view=self,
+                **payload,
                 ephemeral=ephemeral
             )
         self.message = msg
+        self.editor.sent(msg, payload)
 
     async def delete(self):
+        self.editor.cancel()
         await self.message.delete()
 
 
 class PlayerQueue:
-    def __init__(self) -> None:
-        self.upcoming = []
-        self.past = []
+    """Every queued track lives in one :class:`ChunkedList`. ``cursor`` points at
+    the current track, everything before it is history and everything after it
+    is upcoming, so moving between tracks never copies anything. Upcoming
+    positions used by the methods below are zero-based and relative to the
+    current track. Looping only moves the cursor: ONE keeps it in place when a
+    track ends on its own and ALL wraps it around the ends of the store.
 
-    def get_next(self):
-        if len(self.upcoming) == 0:
-            return None
+    Shuffling leaves ``tracks`` in its original order and plays through a view
+    instead: positions before ``shuffle_base`` map to themselves, later ones
+    map through ``shuffle_order``, which is filled lazily from a
+    :class:`LazyShuffle` pool as tracks are needed. While shuffled the store is
+    only appended to and removed tracks are left as ``None`` holes, so
+    unshuffling just maps the cursor back into the store. Once trimmed history
+    and holes make up half of the store it is rebuilt without them (see
+    :meth:`compact`); the pool then draws positions in ``shuffle_values``.
+
+    ``version`` changes whenever the contents or order of the queue change, but
+    not when only the cursor moves. For saving only what changed, ``offset``
+    counts the tracks ever trimmed off the front of the store and ``layout``
+    changes whenever the store is edited other than by appending to it or
+    trimming its front. Every change, and every new current track,
+    is reported once to each of ``listeners``. Listeners are called
+    synchronously and should only schedule work.
+    """
+    # History is trimmed in batches so the prefix delete stays amortized O(1)
+    TRIM_BATCH = 64
+
+    def __init__(self, history_size: int = config.QUEUE_HISTORY_SIZE) -> None:
+        self.tracks = ChunkedList()
+        self.cursor = -1
+        self.history_size = history_size
+        self.loop_state = PlayerLoopState.NONE
+        self.shuffle_base = 0
+        self.shuffle_order: ChunkedList | None = None
+        self.shuffle_pool: LazyShuffle | None = None
+        self.shuffle_values: ChunkedList | None = None
+        self.holes = 0
+        self.offset = 0
+        self.layout = 0
+        self.version = 0
+        self.listeners: list[Callable[[PlayerQueue], None]] = []
+
+    def __len__(self) -> int:
+        if not self.shuffled:
+            return len(self.tracks)
+        return self.shuffle_base + len(self.shuffle_order) + self.shuffle_pool.remaining
+
+    def changed(self):
+        self.version += 1
+        self.notify()
+
+    def notify(self):
+        # Listeners may remove themselves
+        for listener in list(self.listeners):
+            listener(self)
+
+    @property
+    def shuffled(self) -> bool:
+        return self.shuffle_order is not None
+
+    def index(self, position: int) -> int:
+        """Maps a play-order position to its index in ``tracks``."""
+        if not self.shuffled or position < self.shuffle_base:
+            return position
+
+        offset = position - self.shuffle_base
+        while len(self.shuffle_order) <= offset and self.shuffle_pool.remaining:
+            self.shuffle_order.append(self.draw())
+        return self.shuffle_order[offset]
+
+    def draw(self) -> int:
+        value = self.shuffle_pool.draw()
+        return value if self.shuffle_values is None else self.shuffle_values[value]
+
+    def push(self, i: int):
+        """Puts index ``i`` of the store back into the shuffle pool."""
+        if self.shuffle_values is None:
+            self.shuffle_pool.push(i)
+        else:
+            self.shuffle_values.append(i)
+            self.shuffle_pool.push(len(self.shuffle_values) - 1)
+
+    def at(self, position: int) -> Track:
+        return self.tracks[self.index(position)]
+
+    def expose(self, position: int):
+        """Lowers the shuffle base so that ``position`` can be edited through ``shuffle_order``."""
+        if self.shuffled and position < self.shuffle_base:
+            for i in range(self.shuffle_base - 1, position - 1, -1):
+                self.shuffle_order.insert(0, i)
+            self.shuffle_base = position
+
+    @property
+    def current(self) -> Track | None:
+        if 0 <= self.cursor < len(self):
+            return self.at(self.cursor)
+        return None
+
+    @property
+    def upcoming_count(self) -> int:
+        return len(self) - self.cursor - 1
+
+    @property
+    def history_count(self) -> int:
+        return max(self.cursor, 0)
 
-        current = self.upcoming.pop(0)
-        self.past.append(current)
-        return current
+    @property
+    def has_next(self) -> bool:
+        if self.loop_state == PlayerLoopState.ALL:
+            return len(self) > 0
+        return self.upcoming_count > 0
+
+    @property
+    def has_previous(self) -> bool:
+        if self.loop_state == PlayerLoopState.ALL:
+            return len(self) > 1
+        return self.cursor > 0
+
+    def upcoming(self, start: int = 0, stop: int | None = None) -> list[Track]:
+        first = self.cursor + 1 + start
+        last = len(self) if stop is None else min(self.cursor + 1 + stop, len(self))
+        if not self.shuffled:
+            return list(self.tracks.iter_from(first, max(last - first, 0)))
+        return [self.at(position) for position in range(first, last)]
+
+    def get_next(self, auto: bool = False):
+        """Moves to the next track. ``auto`` is set when the current track finished
+        playing, which is the only time loop ONE repeats it."""
+        if auto and self.loop_state == PlayerLoopState.ONE and self.current is not None:
+            return self.current
+
+        if self.upcoming_count <= 0:
+            if self.loop_state != PlayerLoopState.ALL or len(self) == 0:
+                return None
+            self.cursor = -1
+
+        self.cursor += 1
+        self.trim_history()
+        return self.current
     
     def get_previous(self):
-        if len(self.past) == 0:
-            return None
+        if self.cursor <= 0:
+            if self.loop_state != PlayerLoopState.ALL or len(self) <= 1:
+                return None
+            self.cursor = len(self)
         
-        self.upcoming.append(self.past.pop(len(self.past)-1))
-        current = self.past[len(self.past)-1]
-        return current
+        self.cursor -= 1
+        return self.current
+
+    def skip_to(self, index: int) -> Track | None:
+        if not 0 <= index < self.upcoming_count:
+            return None
+
+        self.cursor += index + 1
+        self.trim_history()
+        return self.current
+
+    def trim_history(self):
+        """Drops history beyond ``history_size`` and, while shuffled, the holes
+        left by removed tracks."""
+        # Looping the whole queue needs its history
+        excess = 0 if self.loop_state == PlayerLoopState.ALL else max(self.cursor - self.history_size, 0)
+        if not self.shuffled:
+            if excess >= self.TRIM_BATCH:
+                self.tracks.delete_range(0, excess)
+                self.cursor -= excess
+                self.offset += excess
+                self.changed()
+            return
+
+        # Rebuilding the store is O(n), so it waits until half of it is dead
+        dead = excess + self.holes
+        if dead >= self.TRIM_BATCH and dead * 2 >= len(self.tracks):
+            self.compact(excess)
+
+    def compact(self, excess: int):
+        """Rebuilds the store of a shuffled queue without its first ``excess``
+        positions and without holes, keeping the original order for unshuffling."""
+        self.index(self.cursor)
+        identity = min(excess, self.shuffle_base)
+        dropped = excess - identity
+
+        dead = bytearray(len(self.tracks))
+        dead[:identity] = b"\x01" * identity
+        for i in self.shuffle_order.iter_from(0, dropped):
+            dead[i] = 1
+
+        kept = []
+        remap = [0] * len(self.tracks)
+        for i, track in enumerate(self.tracks):
+            if not dead[i] and track is not None:
+                remap[i] = len(kept)
+                kept.append(track)
+
+        values = self.shuffle_pool.remaining_values()
+        if self.shuffle_values is not None:
+            values = (self.shuffle_values[value] for value in values)
+        self.shuffle_values = ChunkedList(remap[i] for i in values)
+        # Derived from the old pool so seeded shuffles stay reproducible
+        seed = (self.shuffle_pool.seed + self.shuffle_pool.drawn) % 2**32
+        self.shuffle_pool = LazyShuffle(0, len(self.shuffle_values), seed)
+
+        self.shuffle_order = ChunkedList(remap[i] for i in self.shuffle_order.iter_from(dropped))
+        self.shuffle_base -= identity
+        self.tracks = ChunkedList(kept)
+        self.cursor -= excess
+        self.holes = 0
+        self.layout += 1
+        self.changed()
     
     def add(self, item: Track | list[Track]):
-        if isinstance(item, list):
-            self.upcoming.extend(item)
-        else:
-            self.upcoming.append(item)
+        self.extend(item if isinstance(item, list) else [item])
+
+    def extend(self, items: list[Track]):
+        """Appends a batch of tracks as a single change."""
+        if not items:
+            return
+
+        start = len(self.tracks)
+        self.tracks.extend(items)
+        if self.shuffled:
+            for i in range(start, len(self.tracks)):
+                self.push(i)
+        self.changed()
 
     def add_to_front(self, item):
-        self.upcoming.insert(0, item)
+        self.changed()
+        if not self.shuffled:
+            self.tracks.insert(self.cursor + 1, item)
+            self.layout += 1
+            return
+
+        self.expose(self.cursor + 1)
+        self.index(self.cursor)
+        self.tracks.append(item)
+        self.shuffle_order.insert(self.cursor + 1 - self.shuffle_base, len(self.tracks) - 1)
+
+    def remove(self, index: int) -> Track | None:
+        if not 0 <= index < self.upcoming_count:
+            return None
+
+        position = self.cursor + 1 + index
+        self.changed()
+        self.layout += 1
+        if not self.shuffled:
+            return self.tracks.pop(position)
+
+        self.expose(position)
+        self.index(position)
+        i = self.shuffle_order.pop(position - self.shuffle_base)
+        track, self.tracks[i] = self.tracks[i], None
+        self.holes += 1
+        self.trim_history()
+        return track
+
+    def move(self, source: int, destination: int) -> Track | None:
+        if not 0 <= source < self.upcoming_count:
+            return None
+
+        destination = min(max(destination, 0), self.upcoming_count - 1)
+        source, destination = self.cursor + 1 + source, self.cursor + 1 + destination
+        self.changed()
+        if not self.shuffled:
+            self.tracks.move(source, destination)
+            self.layout += 1
+            return self.tracks[destination]
+
+        self.expose(self.cursor + 1)
+        self.index(max(source, destination))
+        self.shuffle_order.move(source - self.shuffle_base, destination - self.shuffle_base)
+        return self.at(destination)
+
+    def clear_upcoming(self):
+        self.changed()
+        self.layout += 1
+        if not self.shuffled:
+            self.tracks.delete_range(self.cursor + 1, len(self.tracks))
+            return
+
+        history = [self.at(position) for position in range(self.cursor + 1)]
+        self.drop_shuffle()
+        self.tracks = ChunkedList(history)
+        self.holes = 0
     
     def clear(self):
-        self.upcoming = []
-        self.past = []
+        self.changed()
+        self.layout += 1
+        self.tracks.clear()
+        self.cursor = -1
+        self.drop_shuffle()
+        self.holes = 0
+
+    def shuffle(self, seed: int | None = None):
+        """Shuffles the upcoming tracks. Nothing is drawn until it is played or shown."""
+        self.changed()
+        if self.shuffled:
+            # Only the tracks drawn ahead of the cursor go back into the pool
+            self.expose(self.cursor + 1)
+            self.index(self.cursor)
+            offset = self.cursor + 1 - self.shuffle_base
+            for i in list(self.shuffle_order.iter_from(offset)):
+                self.push(i)
+            self.shuffle_order.delete_range(offset, len(self.shuffle_order))
+            return
+
+        self.shuffle_base = self.cursor + 1
+        self.shuffle_order = ChunkedList()
+        self.shuffle_pool = LazyShuffle(self.shuffle_base, len(self.tracks), seed)
 
-    def shuffle(self):
-        random.shuffle(self.upcoming)
+    def unshuffle(self):
+        """Restores the original order, continuing after the current track."""
+        if not self.shuffled:
+            return
+
+        self.changed()
+        if self.cursor >= 0:
+            self.cursor = self.index(self.cursor)
+        self.drop_shuffle()
+
+        if self.holes:
+            self.cursor -= sum(track is None for track in self.tracks.iter_from(0, max(self.cursor, 0)))
+            self.tracks = ChunkedList(track for track in self.tracks if track is not None)
+            self.holes = 0
+            self.layout += 1
+
+    def shuffle_state(self) -> tuple[int, list[int]] | None:
+        """Returns what has to be saved of the shuffle: the base and the order drawn
+        so far. Tracks that were not drawn yet are shuffled again on restore."""
+        if not self.shuffled:
+            return None
+        return self.shuffle_base, list(self.shuffle_order)
+
+    def restore(
+        self,
+        tracks: list[Track | None],
+        cursor: int,
+        loop_state: PlayerLoopState,
+        shuffle: tuple[int, list[int]] | None = None
+    ):
+        """Restores a saved store, where removed tracks are ``None``, and its shuffle state."""
+        self.clear()
+        self.loop_state = loop_state
+        if shuffle is None:
+            self.tracks.extend(track for track in tracks if track is not None)
+        else:
+            self.tracks.extend(tracks)
+            self.holes = sum(track is None for track in tracks)
+            self.shuffle_base, order = shuffle
+            self.shuffle_order = ChunkedList(order)
+            drawn = set(order)
+            self.shuffle_values = ChunkedList(
+                i for i in range(self.shuffle_base, len(tracks))
+                if tracks[i] is not None and i not in drawn
+            )
+            self.shuffle_pool = LazyShuffle(0, len(self.shuffle_values))
+        self.cursor = min(cursor, len(self) - 1)
+
+    def drop_shuffle(self):
+        self.shuffle_base = 0
+        self.shuffle_order = None
+        self.shuffle_pool = None
+        self.shuffle_values = None
 
 
 class Player(wavelink.Player):
-    def __init__(self, bot: Bot, channel: discord.VoiceChannel):
-        super().__init__(bot, channel)
+    """Playback is driven by a small state machine. User actions and track end
+    events only move the queue cursor and name the track that should play next;
+    a single transition task then sends the play request, so overlapping
+    actions collapse into one request for the latest target.
+    """
+    def __init__(self, bot: Bot, channel: discord.VoiceChannel, node: wavelink.Node | None = None):
+        if node is None:
+            super().__init__(bot, channel)
+        else:
+            super().__init__(bot, channel, node=node)
         self.bot = bot
         self.channel = channel
         self.queue = PlayerQueue()
         self.current: Track = None
         self.board = None
-        self.loop_state = None
-        self.hold_queue = False
-        
-    async def advance(self):
-        if self.hold_queue:
+        self.state = PlayerState.IDLE
+        self.pending: Track | None = None
+        self.pending_start: int | None = None
+        self.transition_task: asyncio.Task | None = None
+        self.lookahead_task: asyncio.Task | None = None
+        self.track_ended_at: float | None = None
+        self.gaps: deque[float] = deque(maxlen=100)
+        self.ingestions: deque[Ingestion] = deque()
+        self.ingest_task: asyncio.Task | None = None
+        self.queue.listeners.append(self.on_queue_change)
+
+    def on_queue_change(self, queue: PlayerQueue):
+        if self.board is not None and self.board.message is not None:
+            self.board.editor.request()
+
+    async def on_track_end(self, reason: str):
+        # REPLACED and STOPPED are the echoes of our own play/stop requests,
+        # and a transition in flight has already chosen what plays next.
+        if reason not in TrackEndReason.ADVANCE or self.state is PlayerState.LOADING:
+            return
+
+        self.track_ended_at = time.perf_counter()
+        # Nothing is playing any more; if the queue has run out the player stays
+        # idle, so the next queued track starts it again.
+        self.state = PlayerState.IDLE
+        # Loop ONE repeats a finished track, never one that failed to load
+        await self.advance(auto=reason == TrackEndReason.FINISHED)
+
+    async def transition(self, track: Track | None, start: int | None = None):
+        """Requests ``track`` to be played, coalescing with a transition in flight."""
+        if track is None:
             return
-            
+
+        self.pending = track
+        self.pending_start = start
+        if self.transition_task is None or self.transition_task.done():
+            self.transition_task = self.bot.loop.create_task(self.run_transition())
+        await asyncio.shield(self.transition_task)
+
+    async def run_transition(self):
+        failures = 0
+        while self.pending is not None:
+            track, start = self.pending, self.pending_start
+            self.pending, self.pending_start = None, None
+            self.state = PlayerState.LOADING
+
+            if await self.play(track, replace=True, start=start):
+                # stop() may have been called while the request was in flight
+                if self.state is PlayerState.LOADING:
+                    self.state = PlayerState.PLAYING
+                failures = 0
+            elif self.pending is None and self.state is PlayerState.LOADING:
+                # A looping queue of unplayable tracks would otherwise spin forever
+                failures += 1
+                if failures < len(self.queue):
+                    self.pending = self.queue.get_next()
+
+        if self.state is PlayerState.LOADING:
+            self.state = PlayerState.IDLE
+
+    async def start(self):
+        """Starts the next queued track if nothing is playing or loading."""
+        if self.is_idle:
+            await self.advance()
+
+    async def advance(self, auto: bool = False):
         try:
-            track = self.queue.get_next()
-            if track is None:
-                return
-            await self.play(track, replace=False)
+            await self.transition(self.queue.get_next(auto=auto))
 
         except Exception as e:
             logger.error(e)
 
-    async def next(self):
-        self.hold_queue = True
-
-        track = self.queue.get_next()
-        if track is None:
+    def track_started(self):
+        """Records the silence between the end of the last track and the start of this one."""
+        if self.track_ended_at is None:
             return
-        await self.play(track, replace=True)
 
-        self.hold_queue = False
+        gap = time.perf_counter() - self.track_ended_at
+        self.track_ended_at = None
+        self.gaps.append(gap)
+        logger.debug(f"[PLAYER] {self.guild.id} inter-track gap: {gap*1000:,.0f} ms")
 
-    async def previous(self):
-        self.hold_queue = True
+    @property
+    def is_idle(self) -> bool:
+        return self.state in (PlayerState.IDLE, PlayerState.STOPPED)
 
-        if len(self.queue.past) <= 1:
-            return
+    @property
+    def average_gap(self) -> float:
+        return sum(self.gaps) / len(self.gaps) if self.gaps else 0.0
 
-        track = self.queue.get_previous()
-        if track is None:
-            return
-        await self.play(track, replace=True)
+    def schedule_lookahead(self):
+        if self.lookahead_task is None or self.lookahead_task.done():
+            self.lookahead_task = self.bot.loop.create_task(self.lookahead())
+
+    async def lookahead(self):
+        """Resolves the next few upcoming tracks so advancing needs no lookup."""
+        for track in self.queue.upcoming(0, config.LOOKAHEAD_SIZE):
+            if not track.resolved:
+                await YouTubeSearch.resolve(track)
+
+    async def extend(self, tracks: list[Track]) -> bool:
+        """Queues a batch of tracks with one queue change and at most one
+        playback start. Returns whether playback was started."""
+        if not tracks:
+            return False
+
+        self.queue.extend(tracks)
+        started = self.is_idle
+        if started:
+            await self.start()
+        self.schedule_lookahead()
+        return started
+
+    def ingest(self, ingestion: Ingestion):
+        """Adds a tracklist in the background, after any tracklist still being added."""
+        self.ingestions.append(ingestion)
+        if self.ingest_task is None or self.ingest_task.done():
+            self.ingest_task = self.bot.loop.create_task(self.run_ingestions())
+
+    async def run_ingestions(self):
+        while self.ingestions:
+            ingestion = self.ingestions[0]
+            try:
+                await ingestion.run()
+            except Exception as e:
+                logger.error(e)
+            finally:
+                if self.ingestions and self.ingestions[0] is ingestion:
+                    self.ingestions.popleft()
+
+    def cancel_ingestions(self):
+        for ingestion in self.ingestions:
+            ingestion.cancel()
+        self.ingestions.clear()
 
-        self.hold_queue = False
+        if self.ingest_task is not None:
+            self.ingest_task.cancel()
+            self.ingest_task = None
+
+    async def next(self):
+        await self.transition(self.queue.get_next())
+
+    async def previous(self):
+        await self.transition(self.queue.get_previous())
 
     async def play(
         self, 
@@ -285,31 +756,107 @@ class Player(wavelink.Player):
         pause: Optional[bool] = None
     ):
         try:
+            if not source.resolved and not await YouTubeSearch.resolve(source):
+                logger.warning(f"[PLAYER] Skipping unplayable track '{source.title}'")
+                return False
+
             await super().play(source.wavelink, replace, start, end, volume, pause)
             self.current = source
+            self.queue.notify()
+            self.schedule_lookahead()
 
             if self.board != None:
                 await self.board.update()
+            return True
         except Exception as e:
             logger.error(e)
+            return False
+
+    async def skip_to(self, index: int):
+        await self.transition(self.queue.skip_to(index))
+
+    async def stop(self):
+        self.pending = None
+        self.state = PlayerState.STOPPED
+        await super().stop()
 
     async def shuffle(self):
-        if len(self.queue.upcoming) <= 0:
+        if self.queue.upcoming_count <= 0:
             return
         else:
             self.queue.shuffle()
+            self.schedule_lookahead()
+
+    async def unshuffle(self):
+        self.queue.unshuffle()
+        self.schedule_lookahead()
+
+    @property
+    def loop_state(self) -> PlayerLoopState:
+        return self.queue.loop_state
+
+    def set_loop(self, state: PlayerLoopState):
+        self.queue.loop_state = state
 
     async def loop(self):
-        if self.loop_state == PlayerLoopState.NONE:
-            self.loop_state = PlayerLoopState.ALL
+        """Cycles through NONE -> ALL -> ONE -> NONE."""
+        cycle = {
+            PlayerLoopState.NONE: PlayerLoopState.ALL,
+            PlayerLoopState.ALL: PlayerLoopState.ONE,
+            PlayerLoopState.ONE: PlayerLoopState.NONE,
+        }
+        self.set_loop(cycle[self.loop_state])
 
-        if self.loop_state == PlayerLoopState.ALL:
-            self.loop_state = PlayerLoopState.ONE
+    async def migrate(self, node: wavelink.Node):
+        """Moves the player to another node and resumes the current track where it
+        was. A player that is not playing anything is only moved."""
+        resume = self.state in (PlayerState.PLAYING, PlayerState.LOADING)
+        # A track still loading starts from the beginning on the new node
+        position = int(self.position * 1000) if self.state is PlayerState.PLAYING else None
+        paused = self.is_paused()
 
-        if self.loop_state == PlayerLoopState.ONE:
-            self.loop_state = PlayerLoopState.NONE
+        # wavelink 1.x keeps each node's players in a list
+        if self in self.node._players:
+            self.node._players.remove(self)
+        self.node = node
+        if self not in node._players:
+            node._players.append(self)
+        await self._dispatch_voice_update(self._voice_state)
+        if not resume:
+            return
+
+        await self.transition(self.queue.current, start=position)
+        if paused:
+            await self.pause()
+
+    def snapshot(self) -> PlayerSnapshot:
+        board_message = self.board.message if self.board is not None else None
+        return PlayerSnapshot(
+            guild_id=self.guild.id,
+            channel_id=self.channel.id,
+            text_channel_id=board_message.channel.id if board_message is not None else None,
+            cursor=self.queue.cursor,
+            position=int(self.position * 1000) if self.is_playing() else 0,
+            loop_state=self.loop_state.value,
+            state=self.state.value,
+            paused=self.is_paused(),
+            offset=self.queue.offset,
+        )
+
+    async def restore(self, snapshot: PlayerSnapshot):
+        """Restores the queue from a snapshot and, if the player was playing,
+        resumes at the saved position."""
+        self.queue.restore(snapshot.tracks, snapshot.cursor, PlayerLoopState(snapshot.loop_state), snapshot.shuffle)
+        state = PlayerState(snapshot.state)
+        if state not in (PlayerState.PLAYING, PlayerState.LOADING):
+            self.state = state
+            return
 
-    async def create_player_board(self, interaction: discord.Interaction):
+        await self.transition(self.queue.current, start=snapshot.position)
+        if snapshot.paused:
+            await self.pause()
+
+    async def create_player_board(self, interaction: discord.Interaction | discord.abc.Messageable):
         self.board = PlayerBoard(self)
         await self.board.respond(interaction)
 
@@ -317,34 +864,163 @@ class Player(wavelink.Player):
         await self.board.delete()
         self.board = None
 
+    async def press(self, button_type: str, message: discord.Message):
+        """Runs a board button clicked on ``message``. A board message left over
+        from before a restart becomes the board again if there is none."""
+        if button_type == "next":
+            await self.next()
+
+        if button_type == "previous":
+            await self.previous()
+
+        if button_type == "pause":
+            if self.is_paused():
+                await self.resume()
+            else:
+                await self.pause()
+
+        if button_type == "shuffle":
+            if self.queue.shuffled:
+                await self.unshuffle()
+            else:
+                await self.shuffle()
+
+        if button_type == "loop":
+            await self.loop()
+
+        if self.board is None and self.current is not None:
+            self.board = PlayerBoard(self)
+            self.board.message = message
+            # Nothing is recorded as sent, so the next request always edits it
+            self.board.editor.message = message
+
+        if self.board is not None:
+            await self.board.update()
+
 
 class PlayerManager:
     def __init__(self, bot: Bot) -> None:
         self.bot = bot
         self.players = {}
+        self.snapshots = PlayerSnapshotStore(config.PLAYER_SNAPSHOT_DB)
+        # What was last saved of each queue: layout, offset, end of the store and shuffle
+        self.saved: dict[int, tuple[int, int, int, tuple | None]] = {}
+        self.balancer: NodeBalancer | None = None
 
         bot.loop.create_task(self.connect_node())
 
     async def connect_node(self):
         await self.bot.wait_until_ready()
 
+        self.balancer = NodeBalancer(self.bot, HTTP.session(), on_node_down=self.migrate_players)
+
         nodes = json.loads(open(config.LAVALINK_NODES_JSON).read())
-        for node in nodes:
+        await self.balancer.connect_all(nodes)
+        self.bot.loop.create_task(self.balancer.probe_loop())
+
+        await self.restore_players()
+        self.bot.loop.create_task(self.snapshot_loop())
+
+    async def migrate_players(self, node: wavelink.Node):
+        """Moves every player off a dead node. Each player goes to the node that is
+        least loaded at that moment, and only a few migrate at a time so the
+        surviving nodes are not flooded with play requests."""
+        players = [player for player in self.players.values() if player.node is node]
+        if not players:
+            return
+
+        logger.warning(f"[NODE] Migrating {len(players)} players off {node.identifier}.")
+        semaphore = asyncio.Semaphore(config.NODE_MIGRATION_CONCURRENCY)
+
+        async def migrate(player: Player):
+            async with semaphore:
+                target = self.balancer.best_node(exclude=(node,))
+                if target is None:
+                    logger.error(f"[NODE] No node available for player in {player.guild.id}.")
+                    return
+
+                try:
+                    await player.migrate(target)
+                    logger.info(f"[NODE] Player in {player.guild.id} moved to {target.identifier}.")
+                except Exception as e:
+                    logger.error(f"[NODE] Failed to migrate player in {player.guild.id}: {e}")
+
+        await asyncio.gather(*(migrate(player) for player in players))
+
+    async def snapshot_loop(self):
+        while not self.bot.is_closed():
+            await asyncio.sleep(config.PLAYER_SNAPSHOT_INTERVAL)
+            for player in list(self.players.values()):
+                await self.save_player(player)
+
+    async def save_player(self, player: Player):
+        """Writes the player state and whatever changed in the queue since the last save."""
+        queue = player.queue
+        if queue.current is None:
+            return
+
+        guild_id = player.guild.id
+        end = queue.offset + len(queue.tracks)
+        shuffle_key = (queue.version, queue.shuffle_base, len(queue.shuffle_order)) if queue.shuffled else None
+        saved = self.saved.get(guild_id)
+
+        changes = TrackChanges()
+        if saved is None or saved[0] != queue.layout:
+            changes.reset = True
+            start = queue.offset
+        else:
+            _, saved_offset, saved_end, saved_shuffle = saved
+            if queue.offset > saved_offset:
+                changes.trimmed = queue.offset
+            start = max(saved_end, queue.offset)
+            changes.shuffle_changed = shuffle_key != saved_shuffle
+
+        changes.added = [
+            (i, track)
+            for i, track in enumerate(queue.tracks.iter_from(start - queue.offset), start)
+            if track is not None
+        ]
+        if changes.reset or changes.shuffle_changed:
+            changes.shuffle_changed = True
+            changes.shuffle = queue.shuffle_state()
+
+        # Taken before saving, the queue may change while it is written
+        state = (queue.layout, queue.offset, end, shuffle_key)
+        try:
+            await self.snapshots.save(player.snapshot(), changes)
+            self.saved[guild_id] = state
+        except Exception as e:
+            logger.error(f"[PLAYER] Failed to save snapshot of {guild_id}: {e}")
+
+    async def restore_players(self):
+        try:
+            snapshots = await self.snapshots.load_all()
+        except Exception as e:
+            logger.error(f"[PLAYER] Failed to load snapshots: {e}")
+            return
+
+        for snapshot in snapshots:
+            guild = self.bot.get_guild(snapshot.guild_id)
+            channel = guild.get_channel(snapshot.channel_id) if guild else None
+            if channel is None or not snapshot.tracks:
+                await self.snapshots.delete(snapshot.guild_id)
+                continue
+
             try:
-                await wavelink.NodePool.create_node(
-                bot=self.bot,
-                spotify_client=spotify.SpotifyClient(
-                    client_id=config.SPOTIFY_CLIENT_ID, 
-                    client_secret=config.SPOTIFY_CLIENT_SECRET
-                ),
-                **node
-            )
+                player = await self.create_player(guild, channel)
+                await player.restore(snapshot)
+
+                text_channel = guild.get_channel(snapshot.text_channel_id) if snapshot.text_channel_id else None
+                if text_channel is not None:
+                    await player.create_player_board(text_channel)
+                logger.info(f"[PLAYER] Restored player in {guild.id} at track {snapshot.cursor + 1}/{len(snapshot.tracks)}.")
             except Exception as e:
-                logger.error(e)
+                logger.error(f"[PLAYER] Failed to restore player in {snapshot.guild_id}: {e}")
 
     async def create_player(self, guild: discord.Guild, channel: discord.VoiceChannel) -> Player:
         if not guild.voice_client:
-            player = await channel.connect(cls=Player)
+            node = self.balancer.best_node() if self.balancer else None
+            player = await channel.connect(cls=functools.partial(Player, node=node))
             self.players[guild.id] = player
             return player
         else:
@@ -358,8 +1034,12 @@ class PlayerManager:
             return player
         
     async def destroy_player(self, guild: discord.Guild) -> None:
+        self.saved.pop(guild.id, None)
+        await self.snapshots.delete(guild.id)
+
         if not guild.voice_client:
             return
         
         player = self.players[guild.id]
-        del self.players[guild.id]
\ No newline at end of file
+        del self.players[guild.id]
+        player.cancel_ingestions()
\ No newline at end of file
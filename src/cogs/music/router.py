@@ -0,0 +1,198 @@
+import re
+from dataclasses import dataclass
+from urllib.parse import urlparse, parse_qs, ParseResult
+import wavelink
+
+from .utils import Track, YouTubeTrackList, SpotifyTrackList
+from .search import YouTubeSearch, SpotifySearch, DirectSearch
+
+
+@dataclass
+class Route:
+    resolver: "Resolver"
+    id: str
+    url: str
+
+    async def load(self) -> Track | YouTubeTrackList | SpotifyTrackList | None:
+        return await self.resolver.load(self)
+
+
+class Resolver:
+    """Recognises one kind of source in a parsed url and loads it by id.
+    ``match`` returns the id or None, ``canonical`` turns the id back into the
+    url that is loaded, so equal sources share caches whatever was pasted."""
+    # Title of the message announcing what was added
+    title = "Song added"
+    # Whether the resolver accepts any url, and so must not guess at urls without a scheme
+    generic = False
+
+    def match(self, url: ParseResult) -> str | None:
+        raise NotImplementedError
+
+    def canonical(self, id: str) -> str:
+        return id
+
+    async def load(self, route: Route):
+        raise NotImplementedError
+
+
+YOUTUBE_HOSTS = {"youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com"}
+YOUTUBE_VIDEO_ID = re.compile(r"[A-Za-z0-9_-]{11}")
+
+
+class YouTubePlaylistResolver(Resolver):
+    title = "Playlist added"
+
+    def match(self, url: ParseResult) -> str | None:
+        if url.hostname not in YOUTUBE_HOSTS and url.hostname != "youtu.be":
+            return None
+        return parse_qs(url.query).get("list", [None])[0]
+
+    def canonical(self, id: str) -> str:
+        return f"https://www.youtube.com/playlist?list={id}"
+
+    async def load(self, route: Route) -> YouTubeTrackList:
+        return await YouTubeSearch.playlist(route.url)
+
+
+class YouTubeVideoResolver(Resolver):
+    def match(self, url: ParseResult) -> str | None:
+        if url.hostname == "youtu.be":
+            candidate = url.path.strip("/")
+        elif url.hostname in YOUTUBE_HOSTS:
+            parts = url.path.strip("/").split("/")
+            if parts[0] == "watch":
+                candidate = parse_qs(url.query).get("v", [""])[0]
+            elif parts[0] in ("shorts", "live", "embed") and len(parts) > 1:
+                candidate = parts[1]
+            else:
+                return None
+        else:
+            return None
+        return candidate if YOUTUBE_VIDEO_ID.fullmatch(candidate) else None
+
+    def canonical(self, id: str) -> str:
+        return f"https://www.youtube.com/watch?v={id}"
+
+    async def load(self, route: Route) -> Track | None:
+        return await YouTubeSearch.video(route.url)
+
+
+class SpotifyResolver(Resolver):
+    kind = ""
+
+    def match(self, url: ParseResult) -> str | None:
+        if url.scheme == "spotify":
+            parts = url.path.split(":")
+        elif url.hostname == "open.spotify.com":
+            parts = [part for part in url.path.split("/") if part and not part.startswith("intl-")]
+        else:
+            return None
+
+        if len(parts) >= 2 and parts[0] == self.kind:
+            return parts[1]
+        return None
+
+    def canonical(self, id: str) -> str:
+        return f"https://open.spotify.com/{self.kind}/{id}"
+
+
+class SpotifyTrackResolver(SpotifyResolver):
+    kind = "track"
+
+    async def load(self, route: Route) -> Track | None:
+        return await SpotifySearch.track(route.url)
+
+
+class SpotifyAlbumResolver(SpotifyResolver):
+    kind = "album"
+    title = "Album added"
+
+    async def load(self, route: Route) -> SpotifyTrackList | None:
+        return await SpotifySearch.album(route.url)
+
+
+class SpotifyPlaylistResolver(SpotifyResolver):
+    kind = "playlist"
+    title = "Playlist added"
+
+    async def load(self, route: Route) -> SpotifyTrackList | None:
+        return await SpotifySearch.playlist(route.url)
+
+
+class SoundCloudResolver(Resolver):
+    def match(self, url: ParseResult) -> str | None:
+        if url.hostname not in ("soundcloud.com", "www.soundcloud.com", "m.soundcloud.com", "on.soundcloud.com"):
+            return None
+        path = url.path.strip("/")
+        return f"{url.hostname}/{path}" if path else None
+
+    def canonical(self, id: str) -> str:
+        host, path = id.split("/", 1)
+        # Short links have to be followed by Lavalink, everything else is one site
+        if host != "on.soundcloud.com":
+            host = "soundcloud.com"
+        return f"https://{host}/{path}"
+
+    async def load(self, route: Route) -> Track | None:
+        return await DirectSearch.track(route.url, wavelink.SoundCloudTrack)
+
+
+class HTTPResolver(Resolver):
+    """Any other url, played as a stream or file by Lavalink's http source."""
+    generic = True
+
+    def match(self, url: ParseResult) -> str | None:
+        if url.scheme in ("http", "https") and url.hostname:
+            return url.geturl()
+        return None
+
+    async def load(self, route: Route) -> Track | None:
+        return await DirectSearch.track(route.url)
+
+
+class SourceRouter:
+    """Sends a /music play query to the first registered resolver that
+    recognises it. Queries that are not urls get no route and are searched."""
+    def __init__(self, resolvers: list[Resolver] = ()) -> None:
+        self.resolvers: list[Resolver] = list(resolvers)
+
+    def register(self, resolver: Resolver, before: type[Resolver] | None = None):
+        """Adds a resolver, ahead of the first one of type ``before`` if given."""
+        for i, registered in enumerate(self.resolvers):
+            if before is not None and isinstance(registered, before):
+                self.resolvers.insert(i, resolver)
+                return
+        self.resolvers.append(resolver)
+
+    def route(self, query: str) -> Route | None:
+        query = query.strip()
+        if not query or any(c.isspace() for c in query):
+            return None
+
+        url = urlparse(query)
+        guessed = False
+        if not url.scheme:
+            # "youtu.be/..." pasted without https://
+            url = urlparse(f"https://{query}")
+            guessed = True
+
+        for resolver in self.resolvers:
+            if guessed and resolver.generic:
+                continue
+
+            id = resolver.match(url)
+            if id:
+                return Route(resolver, id, resolver.canonical(id))
+        return None
+
+
+router = SourceRouter([
+    YouTubePlaylistResolver(),
+    YouTubeVideoResolver(),
+    SpotifyTrackResolver(),
+    SpotifyAlbumResolver(),
+    SpotifyPlaylistResolver(),
+    SoundCloudResolver(),
+    HTTPResolver(),
+])
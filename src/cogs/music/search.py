@@ -1,43 +1,156 @@
+import asyncio
 from abc import ABC
+import aiohttp
 from dataclasses import dataclass
+from typing import Hashable
 import wavelink
 from wavelink.ext import spotify
 from .utils import Track, YouTubeTrackList, SpotifyTrackList
 
+from .spotifyapi import SpotifyAPI, SpotifyAPIError
+from .trackcache import TrackCacheStore
+
+from utils.cache import TTLCache
 from utils.logger import logger
 import config
 
-from async_spotify import SpotifyApiClient
-from async_spotify.authentification.authorization_flows import ClientCredentialsFlow
-from async_spotify.spotify_errors import SpotifyAPIError
+class SingleFlight:
+    """Runs at most one call per key at a time. Callers that ask for a key
+    while its call is running wait for that call and share its result."""
+    def __init__(self) -> None:
+        self.calls: dict[Hashable, asyncio.Task] = {}
+        self.started = 0
+        self.deduplicated = 0
+
+    async def do(self, key: Hashable, func, *args):
+        task = self.calls.get(key)
+        if task is None:
+            task = asyncio.create_task(func(*args))
+            self.calls[key] = task
+            self.started += 1
+            task.add_done_callback(lambda _: self.forget(key, task))
+        else:
+            self.deduplicated += 1
+        # A caller that gets cancelled must not cancel the call for the others
+        return await asyncio.shield(task)
+
+    def forget(self, key: Hashable, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+
+
+# Resolved tracks by source, kept across restarts. Opened on first use so
+# importing this module does not touch the disk.
+_track_cache: TrackCacheStore | None = None
+
+def track_cache() -> TrackCacheStore:
+    global _track_cache
+    if _track_cache is None:
+        _track_cache = TrackCacheStore(
+            config.TRACK_CACHE_DB,
+            max_size=config.TRACK_CACHE_SIZE,
+            max_age=config.TRACK_CACHE_MAX_AGE
+        )
+    return _track_cache
+
+# Lookups in flight, shared by every guild
+flight = SingleFlight()
 
 
 class YouTubeSearch(ABC):
+    # Search results and loaded videos, shared by every guild. Callers get
+    # copies since queued tracks are filled in and edited in place.
+    cache = TTLCache(maxsize=config.SEARCH_CACHE_SIZE, ttl=config.SEARCH_CACHE_TTL)
+
     @staticmethod
     def get_track(wavelink: wavelink.Track):
-        return Track(
-            title=wavelink.title,
-            url=wavelink.uri,
-            thumbnail=wavelink.thumbnail,
-            wavelink=wavelink
-        )
+        return Track.from_wavelink(wavelink)
+
+    @staticmethod
+    def normalize(query: str) -> str:
+        return " ".join(query.split()).casefold()
 
     @classmethod
     async def search(cls, query: str, amount: int=5) -> list[Track]:
+        key = ("search", cls.normalize(query), amount)
+        wave_list = cls.cache.get(key)
+        if wave_list is None:
+            wave_list = await flight.do(key, cls.load_search, key, query, amount)
+        return [track.copy() for track in wave_list]
+
+    @classmethod
+    async def load_search(cls, key: tuple, query: str, amount: int) -> list[Track]:
         wave_list = []
         for wave in (await wavelink.YouTubeMusicTrack.search(query))[:amount]:
             wave_list.append(
                 cls.get_track(wave)
             )
+        if wave_list:
+            cls.cache.set(key, wave_list)
         return wave_list
-    
+
     @classmethod
-    async def video(cls, url: str) -> Track:
-        wave = await wavelink.YouTubeTrack.search(query=url, return_first=True)
-        return cls.get_track(wave)
-    
-    async def playlist(url: str) -> YouTubeTrackList:
+    async def resolve(cls, track: Track) -> bool:
+        """Looks up an unresolved track on YouTube and fills it in place.
+        Concurrent calls for the same query share one lookup."""
+        if track.resolved:
+            return True
+
+        key = TrackCacheStore.query_key(track.query)
+        try:
+            found = await flight.do(key, cls.lookup, key, track.query)
+        except Exception as e:
+            logger.error(f"Failed to resolve '{track.query}': {e}")
+            return False
+
+        if found is None:
+            return False
+        if not track.resolved:
+            track.fill(found)
+        return True
+
+    @classmethod
+    async def lookup(cls, key: str, query: str) -> Track | None:
+        found = await track_cache().get(key)
+        if found is None:
+            wave = await wavelink.YouTubeTrack.search(query=query, return_first=True)
+            if wave is None:
+                return None
+            found = cls.get_track(wave)
+            await track_cache().put(key, found)
+        return found
+
+    @classmethod
+    async def video(cls, url: str) -> Track | None:
+        # Video ids are case sensitive, so the url is only trimmed
+        key = ("video", url.strip())
+        track = cls.cache.get(key)
+        if track is None:
+            track = await flight.do(key, cls.load_video, key, url)
+        return track.copy() if track is not None else None
+
+    @classmethod
+    async def load_video(cls, key: tuple, url: str) -> Track | None:
+        source = TrackCacheStore.youtube_key(url)
+        track = await track_cache().get(source)
+        if track is None:
+            track = await DirectSearch.fetch(wavelink.YouTubeTrack, url)
+            if track is None:
+                return None
+            await track_cache().put(source, track)
+        cls.cache.set(key, track)
+        return track
+
+    @classmethod
+    async def playlist(cls, url: str) -> YouTubeTrackList:
+        return await flight.do(("playlist", url.strip()), cls.load_playlist, url)
+
+    @staticmethod
+    async def load_playlist(url: str) -> YouTubeTrackList:
         wave: wavelink.YouTubePlaylist = await wavelink.YouTubePlaylist.search(url)
+        await track_cache().put_many([
+            (TrackCacheStore.youtube_key(track.uri), Track.from_wavelink(track)) for track in wave.tracks
+        ])
 
         return YouTubeTrackList(
             name = wave.name,
@@ -47,23 +160,48 @@ class YouTubeSearch(ABC):
         )
 
 
-class SpotifySearch(ABC):
-    spotify_client = None
+class DirectSearch(ABC):
+    """Loads urls that Lavalink plays as they are (YouTube videos, SoundCloud,
+    plain audio files) with a single load call instead of a search."""
+    @staticmethod
+    async def fetch(track_cls: type[wavelink.Track], url: str) -> Track | None:
+        tracks = await wavelink.NodePool.get_node().get_tracks(track_cls, url)
+        return Track.from_wavelink(tracks[0]) if tracks else None
+
+    @classmethod
+    async def track(cls, url: str, track_cls: type[wavelink.Track] = wavelink.Track) -> Track | None:
+        track = await flight.do(("direct", url), cls.load_track, url, track_cls)
+        return track.copy() if track is not None else None
+
+    @classmethod
+    async def load_track(cls, url: str, track_cls: type[wavelink.Track]) -> Track | None:
+        source = TrackCacheStore.url_key(url)
+        track = await track_cache().get(source)
+        if track is None:
+            track = await cls.fetch(track_cls, url)
+            if track is not None:
+                await track_cache().put(source, track)
+        return track
 
+
+class SpotifySearch(ABC):
     @classmethod
     async def init(cls) -> None:
-        cls.spotify_client = SpotifyApiClient(authorization_flow=ClientCredentialsFlow(
-            application_id=config.SPOTIFY_CLIENT_ID,
-            application_secret=config.SPOTIFY_CLIENT_SECRET
-        ))
-        await cls.spotify_client.get_auth_token_with_client_credentials()
-        await cls.spotify_client.create_new_client()
-        logger.info("Logged into spotify")
+        try:
+            await SpotifyAPI.token()
+        except (SpotifyAPIError, aiohttp.ClientError) as e:
+            logger.error(f"Failed to log into spotify: {e}")
+        else:
+            logger.info("Logged into spotify")
+        SpotifyAPI.start()
 
     @classmethod
     async def close(cls) -> None:
-        await cls.spotify_client.close_client()
-        cls.spotify_client = None
+        global _track_cache
+        await SpotifyAPI.close()
+        if _track_cache is not None:
+            _track_cache.close()
+            _track_cache = None
 
     @staticmethod
     def get_spotify_id(url: str):
@@ -71,28 +209,39 @@ class SpotifySearch(ABC):
 
     @staticmethod
     def get_track(wavelink: wavelink.Track):
-        return Track(
-            title=wavelink.title,
-            url=wavelink.uri,
-            thumbnail=wavelink.thumbnail,
-            wavelink=wavelink
-        )
+        return Track.from_wavelink(wavelink)
         
     @classmethod
     async def track(cls, query):
+        track = await flight.do(("spotify track", cls.get_spotify_id(query)), cls.load_track, query)
+        return track.copy()
+
+    @classmethod
+    async def load_track(cls, query):
+        source = TrackCacheStore.spotify_key(cls.get_spotify_id(query))
+        cached = await track_cache().get(source)
+        if cached is not None:
+            return cached
+
         track = await spotify.SpotifyTrack.search(
             query=query,
             type=spotify.SpotifySearchType.track,
             return_first=True
         )
-        return cls.get_track(track)
+        track = cls.get_track(track)
+        await track_cache().put(source, track)
+        return track
 
     @classmethod
     async def album(cls, url):
+        return await flight.do(("spotify album", cls.get_spotify_id(url)), cls.load_album, url)
+
+    @classmethod
+    async def load_album(cls, url):
         album_id = cls.get_spotify_id(url)
         try:
-            album = await cls.spotify_client.albums.get_one(album_id)
-        except SpotifyAPIError:
+            album = await SpotifyAPI.get(f"albums/{album_id}")
+        except (SpotifyAPIError, aiohttp.ClientError):
             return None
         
         try:
@@ -104,15 +253,20 @@ class SpotifySearch(ABC):
             name=album["name"],
             url=url,
             thumbnail=album_thumbnail,
-            type="album"
+            type="album",
+            cache=track_cache()
         )
             
     @classmethod
     async def playlist(cls, url):
+        return await flight.do(("spotify playlist", cls.get_spotify_id(url)), cls.load_playlist, url)
+
+    @classmethod
+    async def load_playlist(cls, url):
         playlist_id = cls.get_spotify_id(url)
         try:
-            playlist = await cls.spotify_client.playlists.get_one(playlist_id)
-        except SpotifyAPIError:
+            playlist = await SpotifyAPI.get(f"playlists/{playlist_id}", fields="name,images")
+        except (SpotifyAPIError, aiohttp.ClientError):
             return None
         
         try:
@@ -124,5 +278,6 @@ class SpotifySearch(ABC):
             name=playlist["name"],
             url=url,
             thumbnail=playlist_thumbnail,
-            type="playlist"
+            type="playlist",
+            cache=track_cache()
         )
\ No newline at end of file
@@ -0,0 +1,189 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+from dataclasses import dataclass, field
+
+from .utils import Track
+
+
+@dataclass
+class PlayerSnapshot:
+    guild_id: int
+    channel_id: int
+    text_channel_id: int | None
+    cursor: int
+    position: int
+    loop_state: str
+    # PlayerState value; only a playing player starts its track again on restore
+    state: str
+    paused: bool
+    # Index of the first stored track, counting every track ever trimmed off the queue
+    offset: int = 0
+    # The queue's store; removed tracks of a shuffled queue are None
+    tracks: list[Track | None] = field(default_factory=list)
+    # Shuffle base and drawn order (see PlayerQueue.shuffle_state), None if not shuffled
+    shuffle: tuple[int, list[int]] | None = None
+
+
+@dataclass
+class TrackChanges:
+    """What happened to a queue's store since the last save. ``added`` rows
+    are keyed by store index plus the queue's offset."""
+    # Every stored track is dropped before ``added`` is written
+    reset: bool = False
+    # Tracks before this index were trimmed off
+    trimmed: int | None = None
+    added: list[tuple[int, Track]] = field(default_factory=list)
+    # Whether ``shuffle`` has to be written
+    shuffle_changed: bool = False
+    shuffle: tuple[int, list[int]] | None = None
+
+
+class PlayerSnapshotStore:
+    """Keeps the last known state of every player in a local SQLite file.
+
+    The player row (cursor, position, loop and playback state) is cheap and written on
+    every save. Tracks are saved as the queue's store, by index, so a save
+    only writes the :class:`TrackChanges` since the last one: appended
+    tracks and trims of the front. The store is only written again whole
+    after it was edited in place. A shuffled queue also saves the order
+    drawn so far, when it changed.
+    """
+    # Snapshots written by other versions are dropped
+    VERSION = 3
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS players (
+            guild_id INTEGER PRIMARY KEY,
+            channel_id INTEGER NOT NULL,
+            text_channel_id INTEGER,
+            cursor INTEGER NOT NULL,
+            position INTEGER NOT NULL,
+            loop_state TEXT NOT NULL,
+            state TEXT NOT NULL,
+            paused INTEGER NOT NULL,
+            offset INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS shuffles (
+            guild_id INTEGER PRIMARY KEY,
+            base INTEGER NOT NULL,
+            drawn TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS tracks (
+            guild_id INTEGER NOT NULL,
+            idx INTEGER NOT NULL,
+            title TEXT NOT NULL,
+            url TEXT,
+            thumbnail TEXT,
+            length REAL NOT NULL,
+            encoded TEXT,
+            query TEXT,
+            PRIMARY KEY (guild_id, idx)
+        );
+    """
+
+    def __init__(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        if self.connection.execute("PRAGMA user_version").fetchone()[0] != self.VERSION:
+            self.connection.executescript("""
+                DROP TABLE IF EXISTS players;
+                DROP TABLE IF EXISTS tracks;
+                DROP TABLE IF EXISTS shuffles;
+            """)
+            self.connection.execute(f"PRAGMA user_version = {self.VERSION}")
+        self.connection.executescript(self.SCHEMA)
+        self.lock = asyncio.Lock()
+
+    async def run(self, func, *args):
+        async with self.lock:
+            return await asyncio.to_thread(func, *args)
+
+    def _save(self, snapshot: PlayerSnapshot, changes: TrackChanges | None):
+        guild_id = snapshot.guild_id
+        with self.connection:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    guild_id, snapshot.channel_id, snapshot.text_channel_id,
+                    snapshot.cursor, snapshot.position, snapshot.loop_state,
+                    snapshot.state, int(snapshot.paused), snapshot.offset, time.time(),
+                )
+            )
+            if changes is None:
+                return
+
+            if changes.reset:
+                self.connection.execute("DELETE FROM tracks WHERE guild_id = ?", (guild_id,))
+            elif changes.trimmed is not None:
+                self.connection.execute("DELETE FROM tracks WHERE guild_id = ? AND idx < ?", (guild_id, changes.trimmed))
+
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (guild_id, i, t.title, t.url, t.thumbnail, t.length, t.encoded, t.query)
+                    for i, t in changes.added
+                )
+            )
+
+            if not changes.shuffle_changed:
+                return
+            if changes.shuffle is None:
+                self.connection.execute("DELETE FROM shuffles WHERE guild_id = ?", (guild_id,))
+            else:
+                base, drawn = changes.shuffle
+                self.connection.execute(
+                    "INSERT OR REPLACE INTO shuffles VALUES (?, ?, ?)",
+                    (guild_id, base, json.dumps(drawn))
+                )
+
+    def _load_all(self) -> list[PlayerSnapshot]:
+        snapshots = []
+        for row in self.connection.execute("SELECT * FROM players").fetchall():
+            guild_id, channel_id, text_channel_id, cursor, position, loop_state, state, paused, offset, _ = row
+            tracks: list[Track | None] = []
+            for idx, title, url, thumbnail, length, encoded, query in self.connection.execute(
+                "SELECT idx, title, url, thumbnail, length, encoded, query FROM tracks WHERE guild_id = ? ORDER BY idx",
+                (guild_id,)
+            ):
+                # Removed tracks of a shuffled queue are missing rows
+                tracks.extend([None] * (idx - offset - len(tracks)))
+                tracks.append(Track(title=title, url=url, thumbnail=thumbnail, length=length, encoded=encoded, query=query))
+
+            shuffle = self.connection.execute(
+                "SELECT base, drawn FROM shuffles WHERE guild_id = ?", (guild_id,)
+            ).fetchone()
+            snapshots.append(PlayerSnapshot(
+                guild_id=guild_id,
+                channel_id=channel_id,
+                text_channel_id=text_channel_id,
+                cursor=cursor,
+                position=position,
+                loop_state=loop_state,
+                state=state,
+                paused=bool(paused),
+                offset=offset,
+                tracks=tracks,
+                shuffle=(shuffle[0], json.loads(shuffle[1])) if shuffle is not None else None,
+            ))
+        return snapshots
+
+    def _delete(self, guild_id: int):
+        with self.connection:
+            self.connection.execute("DELETE FROM players WHERE guild_id = ?", (guild_id,))
+            self.connection.execute("DELETE FROM tracks WHERE guild_id = ?", (guild_id,))
+            self.connection.execute("DELETE FROM shuffles WHERE guild_id = ?", (guild_id,))
+
+    async def save(self, snapshot: PlayerSnapshot, changes: TrackChanges | None = None):
+        await self.run(self._save, snapshot, changes)
+
+    async def load_all(self) -> list[PlayerSnapshot]:
+        return await self.run(self._load_all)
+
+    async def delete(self, guild_id: int):
+        await self.run(self._delete, guild_id)
+
+    def close(self):
+        self.connection.close()
@@ -0,0 +1,160 @@
+import time
+import asyncio
+import functools
+from abc import ABC
+import aiohttp
+from wavelink.ext import spotify
+
+from utils.http import HTTP
+from utils.logger import logger
+import config
+
+
+class SpotifyAPIError(Exception):
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(f"{status}: {message}")
+        self.status = status
+        self.message = message
+
+
+class SpotifyAPI(ABC):
+    """The one Spotify access layer of the process.
+
+    Web API calls and the wavelink spotify extension both go through the
+    pooled session from :class:`HTTP` and share a single client credentials
+    token, so the same credentials never hold two sessions or two tokens.
+
+    The token is renewed in the background before it expires (see
+    :meth:`refresh_loop`); :meth:`token` only has to fetch one itself when
+    the loop is not running or failed.
+    """
+    API_URL = "https://api.spotify.com/v1"
+    TOKEN_URL = "https://accounts.spotify.com/api/token"
+    # A token counts as expired this many seconds before Spotify's expiry
+    EXPIRY_MARGIN = 10
+
+    client: spotify.SpotifyClient | None = None
+    client_lock = asyncio.Lock()
+    access_token: str | None = None
+    expires_at = 0.0
+    refreshes = 0
+    refresh_task: asyncio.Task | None = None
+    refresher: asyncio.Task | None = None
+
+    @classmethod
+    async def wavelink_client(cls) -> spotify.SpotifyClient:
+        """The spotify client every Lavalink node is created with. Nodes connect
+        concurrently, so the client is created under a lock and shared."""
+        async with cls.client_lock:
+            if cls.client is None:
+                client = spotify.SpotifyClient(
+                    client_id=config.SPOTIFY_CLIENT_ID,
+                    client_secret=config.SPOTIFY_CLIENT_SECRET
+                )
+                # Drop the session the client opened for itself and let it fetch
+                # its bearer token through us
+                await client.session.close()
+                client.session = HTTP.session()
+                client._get_bearer_token = functools.partial(cls.bearer_token, client)
+                cls.client = client
+                cls.share_token()
+        return cls.client
+
+    @classmethod
+    async def bearer_token(cls, client: spotify.SpotifyClient):
+        """Stands in for the client's own token request: stores our token on it."""
+        await cls.token()
+        client._bearer_token = cls.access_token
+        client._expiry = cls.expires_at
+
+    @classmethod
+    def share_token(cls):
+        if cls.client is not None:
+            cls.client._bearer_token = cls.access_token
+            cls.client._expiry = cls.expires_at
+
+    @classmethod
+    def token_valid(cls) -> bool:
+        return cls.access_token is not None and time.time() < cls.expires_at
+
+    @classmethod
+    async def token(cls) -> str:
+        if not cls.token_valid():
+            await cls.refresh()
+        return cls.access_token
+
+    @classmethod
+    async def refresh(cls) -> str:
+        """Fetches a new token. Callers that arrive while a refresh is running wait for that one."""
+        if cls.refresh_task is None or cls.refresh_task.done():
+            cls.refresh_task = asyncio.create_task(cls.request_token())
+        return await asyncio.shield(cls.refresh_task)
+
+    @classmethod
+    async def request_token(cls) -> str:
+        async with HTTP.session().post(
+            cls.TOKEN_URL,
+            data={"grant_type": "client_credentials"},
+            auth=aiohttp.BasicAuth(config.SPOTIFY_CLIENT_ID, config.SPOTIFY_CLIENT_SECRET),
+        ) as response:
+            data = await response.json()
+            if response.status != 200:
+                raise SpotifyAPIError(response.status, data.get("error_description", "token request failed"))
+
+        cls.access_token = data["access_token"]
+        cls.expires_at = time.time() + int(data["expires_in"]) - cls.EXPIRY_MARGIN
+        cls.refreshes += 1
+        cls.share_token()
+        return cls.access_token
+
+    @classmethod
+    def invalidate(cls, token: str):
+        """Marks a token Spotify rejected as expired, unless it was already replaced."""
+        if cls.access_token == token:
+            cls.expires_at = 0.0
+
+    @classmethod
+    def start(cls):
+        if cls.refresher is None or cls.refresher.done():
+            cls.refresher = asyncio.create_task(cls.refresh_loop())
+
+    @classmethod
+    async def refresh_loop(cls):
+        """Renews the token ``config.SPOTIFY_TOKEN_REFRESH_AHEAD`` seconds before it
+        expires, while the old one still works, so requests never wait for it."""
+        while True:
+            if cls.token_valid():
+                await asyncio.sleep(max(cls.expires_at - config.SPOTIFY_TOKEN_REFRESH_AHEAD - time.time(), 0.0))
+
+            try:
+                await cls.refresh()
+            except Exception as e:
+                logger.error(f"Failed to refresh spotify token: {e}")
+                await asyncio.sleep(config.SPOTIFY_TOKEN_RETRY_INTERVAL)
+
+    @classmethod
+    async def get(cls, path: str, **params) -> dict:
+        for attempt in range(2):
+            token = await cls.token()
+            async with HTTP.session().get(
+                f"{cls.API_URL}/{path}",
+                params=params,
+                headers={"Authorization": f"Bearer {token}"},
+            ) as response:
+                if response.status == 401 and attempt == 0:
+                    cls.invalidate(token)
+                    continue
+
+                data = await response.json()
+                if response.status != 200:
+                    raise SpotifyAPIError(response.status, data.get("error", {}).get("message", ""))
+                return data
+
+    @classmethod
+    async def close(cls):
+        if cls.refresher is not None:
+            cls.refresher.cancel()
+            cls.refresher = None
+        cls.client = None
+        cls.access_token = None
+        await HTTP.close()
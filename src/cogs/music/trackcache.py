@@ -0,0 +1,130 @@
+import os
+import time
+import asyncio
+import sqlite3
+from urllib.parse import urlparse, parse_qs
+
+from .utils import Track
+
+
+class TrackCacheStore:
+    """Persistent map from a track's source (YouTube video, Spotify track,
+    search query) to the encoded Lavalink track and what the board shows.
+
+    Entries older than ``max_age`` seconds are dropped, and past ``max_size``
+    entries the least recently used go first. Lookups hand out new
+    :class:`Track` objects, so callers may edit them freely.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS tracks (
+            source TEXT PRIMARY KEY,
+            title TEXT NOT NULL,
+            url TEXT,
+            thumbnail TEXT,
+            length REAL NOT NULL,
+            encoded TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS tracks_accessed_at ON tracks (accessed_at);
+    """
+    # Eviction runs after this many writes
+    EVICT_EVERY = 256
+
+    def __init__(self, path: str, max_size: int, max_age: float) -> None:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.executescript(self.SCHEMA)
+        self.max_size = max_size
+        self.max_age = max_age
+        self.lock = asyncio.Lock()
+        self.writes = 0
+        self.hits = 0
+        self.misses = 0
+        self._evict()
+
+    @staticmethod
+    def youtube_key(url: str) -> str:
+        parsed = urlparse(url.strip())
+        if parsed.hostname and parsed.hostname.endswith("youtu.be"):
+            video_id = parsed.path.strip("/")
+        else:
+            video_id = parse_qs(parsed.query).get("v", [None])[0]
+        return f"youtube:{video_id}" if video_id else TrackCacheStore.url_key(url)
+
+    @staticmethod
+    def url_key(url: str) -> str:
+        return f"url:{url.strip()}"
+
+    @staticmethod
+    def spotify_key(track_id: str) -> str:
+        return f"spotify:{track_id}"
+
+    @staticmethod
+    def query_key(query: str) -> str:
+        return "query:" + " ".join(query.split()).casefold()
+
+    async def run(self, func, *args):
+        async with self.lock:
+            return await asyncio.to_thread(func, *args)
+
+    def _get(self, source: str) -> Track | None:
+        with self.connection:
+            row = self.connection.execute(
+                "SELECT title, url, thumbnail, length, encoded, created_at FROM tracks WHERE source = ?",
+                (source,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            title, url, thumbnail, length, encoded, created_at = row
+            if created_at < time.time() - self.max_age:
+                self.connection.execute("DELETE FROM tracks WHERE source = ?", (source,))
+                return None
+
+            self.connection.execute("UPDATE tracks SET accessed_at = ? WHERE source = ?", (time.time(), source))
+        return Track(title=title, url=url, thumbnail=thumbnail, length=length, encoded=encoded)
+
+    def _put(self, items: list[tuple[str, Track]]):
+        now = time.time()
+        with self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO tracks VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    (source, t.title, t.url, t.thumbnail, t.length, t.encoded, now, now)
+                    for source, t in items if t.resolved
+                )
+            )
+
+        self.writes += len(items)
+        if self.writes >= self.EVICT_EVERY:
+            self.writes = 0
+            self._evict()
+
+    def _evict(self):
+        with self.connection:
+            self.connection.execute("DELETE FROM tracks WHERE created_at < ?", (time.time() - self.max_age,))
+            count = self.connection.execute("SELECT COUNT(*) FROM tracks").fetchone()[0]
+            if count > self.max_size:
+                self.connection.execute(
+                    "DELETE FROM tracks WHERE source IN (SELECT source FROM tracks ORDER BY accessed_at LIMIT ?)",
+                    (count - self.max_size,)
+                )
+
+    async def get(self, source: str) -> Track | None:
+        track = await self.run(self._get, source)
+        if track is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return track
+
+    async def put(self, source: str, track: Track):
+        await self.run(self._put, [(source, track)])
+
+    async def put_many(self, items: list[tuple[str, Track]]):
+        if items:
+            await self.run(self._put, items)
+
+    def close(self):
+        self.connection.close()
@@ -1,14 +1,77 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from typing import Generator, List
+from urllib.parse import quote_plus
 import wavelink
 from wavelink.ext import spotify
 
-@dataclass
+@dataclass(slots=True)
 class Track:
+    """Queue entry that keeps only what is needed to show and play a track.
+    The wavelink object is rebuilt from the encoded Lavalink track on demand
+    instead of being held for every queued item. Tracks that still have to be
+    looked up on YouTube carry a ``query`` and no ``encoded`` track yet.
+    """
     title: str
     url: str
     thumbnail: str
-    wavelink: wavelink.YouTubeTrack
+    length: float
+    encoded: str | None
+    query: str | None = None
+
+    @classmethod
+    def from_wavelink(cls, track: wavelink.Track) -> "Track":
+        return cls(
+            title=track.title,
+            url=track.uri,
+            # Only YouTube tracks have thumbnails
+            thumbnail=getattr(track, "thumbnail", None),
+            length=track.length,
+            encoded=track.id,
+        )
+
+    @classmethod
+    def from_partial(cls, track: wavelink.PartialTrack, thumbnail: str) -> "Track":
+        return cls(
+            title=track.title,
+            url=f"https://www.youtube.com/results?search_query={quote_plus(track.query)}",
+            thumbnail=thumbnail,
+            length=0,
+            encoded=None,
+            query=track.query,
+        )
+
+    def copy(self) -> "Track":
+        return replace(self)
+
+    @property
+    def resolved(self) -> bool:
+        return self.encoded is not None
+
+    def fill(self, track: "Track"):
+        """Takes over the playable fields of a resolved track."""
+        self.title = track.title
+        self.url = track.url
+        self.thumbnail = track.thumbnail
+        self.length = track.length
+        self.encoded = track.encoded
+
+    def update(self, track: wavelink.Track):
+        self.title = track.title
+        self.url = track.uri
+        self.thumbnail = getattr(track, "thumbnail", None)
+        self.length = track.length
+        self.encoded = track.id
+
+    @property
+    def wavelink(self) -> wavelink.YouTubeTrack:
+        return wavelink.YouTubeTrack(
+            id=self.encoded,
+            info={
+                "title": self.title,
+                "uri": self.url,
+                "length": int(self.length * 1000),
+            },
+        )
 
 
 class YouTubeTrackList:
@@ -19,28 +82,40 @@ class YouTubeTrackList:
         self.tracks = tracks
 
     async def iterator(self):
-        async for track in self.tracks:
-            yield track
+        for track in self.tracks:
+            yield Track.from_wavelink(track)
 
 class SpotifyTrackList:
-    def __init__(self, name: str, url: str, thumbnail: str, type: str) -> None:
+    def __init__(self, name: str, url: str, thumbnail: str, type: str, cache=None) -> None:
         self.name = name
         self.url = url
         self.thumbnail = thumbnail
         self.type = type
+        # TrackCacheStore, tracks found there come out already resolved
+        self.cache = cache
+
+    async def from_partial(self, track: wavelink.PartialTrack) -> Track:
+        if self.cache is not None:
+            cached = await self.cache.get(self.cache.query_key(track.query))
+            if cached is not None:
+                return cached
+        return Track.from_partial(track, self.thumbnail)
 
     async def iterator(self):
+        # Only list the tracks here, the YouTube lookup happens in the player's look-ahead
         if self.type == 'album':
             async for track in spotify.SpotifyTrack.iterator(
                 query=self.url, 
-                type=spotify.SpotifySearchType.album
+                type=spotify.SpotifySearchType.album,
+                partial_tracks=True
             ):
-                yield track
+                yield await self.from_partial(track)
         
         elif self.type == 'playlist':
             async for track in spotify.SpotifyTrack.iterator(
                 query=self.url, 
-                type=spotify.SpotifySearchType.playlist
+                type=spotify.SpotifySearchType.playlist,
+                partial_tracks=True
             ):
-                yield track
+                yield await self.from_partial(track)
         
\ No newline at end of file
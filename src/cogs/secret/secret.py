@@ -1,6 +1,9 @@
 from discord.ext.commands import Bot, Cog, command, Context
 
 from main import logger
+from cogs.music.search import YouTubeSearch, flight
+from utils.http import HTTP
+from utils.attachments import attachment_cache
 import config
 
 class Secret(Cog):
@@ -17,6 +20,25 @@ class Secret(Cog):
         
         await ctx.reply("Command tree synced.")
 
+    @command(name="stats")
+    async def stats_command(self, ctx: Context):
+        if ctx.message.author.id not in config.SUPERUSER:
+            return
+
+        http = HTTP.stats()
+        search = YouTubeSearch.cache.stats()
+        attachments = attachment_cache.stats()
+        await ctx.reply(
+            f"HTTP pool size: {http['pool_size']}, requests: {http['requests']}\n"
+            f"HTTP connections: {http['connections_created']} opened, {http['connections_reused']} reused "
+            f"({http['reuse_ratio']:.0%})\n"
+            f"Search cache: {search['size']}/{search['maxsize']}, {search['hits']} hits, "
+            f"{search['misses']} misses ({search['hit_rate']:.0%})\n"
+            f"Lookups: {flight.started} sent, {flight.deduplicated} deduplicated\n"
+            f"Attachments: {attachments['files']} files, {attachments['bytes'] / 2**20:.1f}/"
+            f"{attachments['max_bytes'] / 2**20:.0f} MiB, {attachments['hits']} hits, {attachments['misses']} misses"
+        )
+
 
 async def setup(bot: Bot):
     await bot.add_cog(Secret(bot))
\ No newline at end of file
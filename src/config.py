@@ -17,6 +17,55 @@ SUPERUSER = [
 ACTIVITY_NAME = "Setting app on my phone. It's fun."
 ACTIVITY_TYPE = discord.ActivityType.playing
 
+# Maximum number of played tracks kept per guild for "previous"
+QUEUE_HISTORY_SIZE = 100
+# Number of upcoming tracks resolved in the background while a song plays
+LOOKAHEAD_SIZE = 3
+# Minimum seconds between two edits of a player board message
+BOARD_EDIT_INTERVAL = 1.0
+# Seconds after the last click that a queue message keeps following the queue
+QUEUE_WATCH_TIMEOUT = 180
+
+# YouTube lookups running at the same time while a Spotify album or playlist is queued
+SPOTIFY_RESOLVE_CONCURRENCY = 8
+# Tracklists are added to the queue in batches of this many tracks, or whatever arrived within the interval (seconds)
+INGEST_BATCH_SIZE = 50
+INGEST_BATCH_INTERVAL = 1.0
+
+# YouTube search results and videos cached in memory, and for how long (seconds)
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 3600
+
+# Connections kept by the shared HTTP session, and how long idle ones stay open (seconds)
+HTTP_POOL_SIZE = 50
+HTTP_KEEPALIVE = 30
+
+# The Spotify token is renewed this many seconds before it expires, failed renewals are retried after the interval
+SPOTIFY_TOKEN_REFRESH_AHEAD = 300
+SPOTIFY_TOKEN_RETRY_INTERVAL = 30
+
 SRC_DIR = os.path.dirname(__file__)
 LOG_FILE = os.path.join(SRC_DIR, "../log/latest.log")
-LAVALINK_NODES_JSON = os.path.join(SRC_DIR, "../lavalink-nodes.json")
\ No newline at end of file
+LAVALINK_NODES_JSON = os.path.join(SRC_DIR, "../lavalink-nodes.json")
+DATA_DIR = os.path.join(SRC_DIR, "../data")
+
+# Player state is saved this often (seconds) and resumed after a restart
+PLAYER_SNAPSHOT_DB = os.path.join(DATA_DIR, "players.sqlite3")
+PLAYER_SNAPSHOT_INTERVAL = 15
+
+# Resolved tracks kept on disk by source (YouTube video, Spotify track, search query),
+# entries expire after TRACK_CACHE_MAX_AGE seconds
+TRACK_CACHE_DB = os.path.join(DATA_DIR, "tracks.sqlite3")
+TRACK_CACHE_SIZE = 100_000
+TRACK_CACHE_MAX_AGE = 7 * 24 * 3600
+
+# Lavalink nodes are pinged this often (seconds) to measure latency and health
+NODE_PROBE_INTERVAL = 30
+NODE_PROBE_TIMEOUT = 5
+# A node that misses this many pings in a row gets no new players
+NODE_MAX_FAILURES = 3
+# Players moved off a dead node at the same time
+NODE_MIGRATION_CONCURRENCY = 5
+# Bytes of paginator attachments kept in memory, and the size from which a file is memory-mapped instead of read
+ATTACHMENT_CACHE_SIZE = 64 * 2**20
+ATTACHMENT_MMAP_THRESHOLD = 2**20
@@ -1,11 +1,11 @@
 import os
 import pathlib
 import discord
-import asyncio
 from discord.ext.commands import Bot
 
 import config
 from cogs.music.search import SpotifySearch
+from utils.attachments import attachment_cache
 from utils.logger import logger
 
 class PinkDot(Bot):
@@ -15,11 +15,15 @@ class PinkDot(Bot):
             help_command=None,
             command_prefix="$"
         )
+        attachment_cache.max_bytes = config.ATTACHMENT_CACHE_SIZE
+        attachment_cache.mmap_threshold = config.ATTACHMENT_MMAP_THRESHOLD
 
     def run(self) -> None:
         super().run(config.DISCORD_BOT_TOKEN, reconnect=True, log_handler=None)
 
-        asyncio.run(SpotifySearch.close())
+    async def close(self) -> None:
+        await super().close()
+        await SpotifySearch.close()
     
     async def load_cogs(self):
         logger.info("Loading cogs...")
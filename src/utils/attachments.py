@@ -0,0 +1,132 @@
+from __future__ import annotations
+
+import io
+import mmap
+import os
+from collections import OrderedDict
+
+__all__ = ("BufferReader", "AttachmentCache", "attachment_cache")
+
+
+class BufferReader(io.RawIOBase):
+    """A read-only, seekable file over a shared buffer.
+
+    Many readers can be open on the same buffer at once. The buffer itself is
+    never copied, reads only copy the bytes that were asked for.
+    """
+
+    def __init__(self, buffer: memoryview) -> None:
+        self.buffer = buffer
+        self.position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self.buffer[self.position:self.position + len(b)]
+        size = len(data)
+        b[:size] = data
+        self.position += size
+        return size
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            position = offset
+        elif whence == io.SEEK_CUR:
+            position = self.position + offset
+        elif whence == io.SEEK_END:
+            position = len(self.buffer) + offset
+        else:
+            raise ValueError(f"invalid whence ({whence})")
+
+        if position < 0:
+            raise ValueError(f"negative seek position {position}")
+        self.position = position
+        return position
+
+    def tell(self) -> int:
+        return self.position
+
+
+class AttachmentCache:
+    """Contents of files sent as attachments, read from disk once and shared by
+    every message that sends them again.
+
+    Parameters
+    ----------
+    max_bytes: :class:`int`
+        Total size of the files kept, 64 MiB by default. Past it the least recently
+        used are dropped; readers still open on a dropped file keep working until
+        they are done.
+    mmap_threshold: :class:`int`
+        Files of at least this many bytes are memory-mapped instead of read, 1 MiB by default.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 2**20, mmap_threshold: int = 2**20) -> None:
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._buffers: OrderedDict[str, memoryview] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buffers)
+
+    def get(self, path: str) -> memoryview:
+        """Returns the contents of the file at ``path``, reading it only if it is not kept."""
+        path = os.path.abspath(path)
+        buffer = self._buffers.get(path)
+        if buffer is not None:
+            self._buffers.move_to_end(path)
+            self.hits += 1
+            return buffer
+
+        self.misses += 1
+        buffer = self.load(path)
+        # A file larger than the whole cache is served but not kept
+        if buffer.nbytes <= self.max_bytes:
+            self._buffers[path] = buffer
+            self.size += buffer.nbytes
+            while self.size > self.max_bytes:
+                _, evicted = self._buffers.popitem(last=False)
+                self.size -= evicted.nbytes
+                self.evictions += 1
+        return buffer
+
+    def load(self, path: str) -> memoryview:
+        with open(path, "rb") as fp:
+            size = os.fstat(fp.fileno()).st_size
+            if size and size >= self.mmap_threshold:
+                return memoryview(mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ))
+            return memoryview(fp.read())
+
+    def open(self, path: str) -> BufferReader:
+        return BufferReader(self.get(path))
+
+    def pop(self, path: str) -> None:
+        buffer = self._buffers.pop(os.path.abspath(path), None)
+        if buffer is not None:
+            self.size -= buffer.nbytes
+
+    def clear(self) -> None:
+        self._buffers.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        return {
+            "files": len(self._buffers),
+            "bytes": self.size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+# Shared by every page that is not given its own cache
+attachment_cache = AttachmentCache()
@@ -0,0 +1,231 @@
+from __future__ import annotations
+
+from itertools import chain, islice
+from typing import Any, Iterable, Iterator
+
+__all__ = ("ChunkedList",)
+
+
+class ChunkedList:
+    """A list split into bounded chunks with a positional index over them.
+
+    Positional reads, inserts and deletes cost ``O(log n)`` to find the chunk
+    plus ``O(load)`` inside it, so editing the middle of a very long sequence
+    never copies the whole thing the way :meth:`list.insert` or
+    :meth:`list.pop` would.
+
+    Parameters
+    ----------
+    iterable: Iterable[Any]
+        Initial items.
+    load: :class:`int`
+        Target chunk size. Chunks are split once they grow past twice this.
+    """
+
+    def __init__(self, iterable: Iterable[Any] = (), load: int = 512) -> None:
+        self._load = load
+        self._chunks: list[list[Any]] = []
+        self._len = 0
+        # Fenwick tree over chunk lengths, rebuilt lazily when chunks split or vanish
+        self._tree: list[int] = []
+        self._dirty = False
+
+        self.extend(iterable)
+
+    def __len__(self) -> int:
+        return self._len
+
+    def __bool__(self) -> bool:
+        return self._len > 0
+
+    def __iter__(self) -> Iterator[Any]:
+        return chain.from_iterable(self._chunks)
+
+    def __reversed__(self) -> Iterator[Any]:
+        for chunk in reversed(self._chunks):
+            yield from reversed(chunk)
+
+    def __repr__(self) -> str:
+        return f"{self.__class__.__name__}({list(self)!r})"
+
+    def __getitem__(self, index: int | slice) -> Any:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                return list(self)[index]
+            return list(self.iter_from(start, stop - start))
+
+        ci, offset = self._locate(index)
+        return self._chunks[ci][offset]
+
+    def __setitem__(self, index: int, value: Any) -> None:
+        ci, offset = self._locate(index)
+        self._chunks[ci][offset] = value
+
+    def __delitem__(self, index: int | slice) -> None:
+        if isinstance(index, slice):
+            start, stop, step = index.indices(self._len)
+            if step != 1:
+                raise ValueError("only contiguous slices can be deleted")
+            self.delete_range(start, stop)
+        else:
+            self.pop(index)
+
+    def _normalize(self, index: int) -> int:
+        if index < 0:
+            index += self._len
+        if not 0 <= index < self._len:
+            raise IndexError("ChunkedList index out of range")
+        return index
+
+    def _build(self) -> None:
+        size = len(self._chunks)
+        tree = [0] * (size + 1)
+        for i, chunk in enumerate(self._chunks, 1):
+            tree[i] += len(chunk)
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self._tree = tree
+        self._dirty = False
+
+    def _update(self, ci: int, delta: int) -> None:
+        if self._dirty:
+            return
+        i = ci + 1
+        size = len(self._chunks)
+        while i <= size:
+            self._tree[i] += delta
+            i += i & -i
+
+    def _locate(self, index: int) -> tuple[int, int]:
+        """Returns ``(chunk index, offset in chunk)`` for a list position."""
+        index = self._normalize(index)
+
+        # Cheap paths for the ends, which is where queues are mostly touched
+        first = len(self._chunks[0])
+        if index < first:
+            return 0, index
+        last = len(self._chunks[-1])
+        if index >= self._len - last:
+            return len(self._chunks) - 1, index - (self._len - last)
+
+        if self._dirty:
+            self._build()
+
+        ci, bit = 0, 1 << (len(self._chunks).bit_length() - 1)
+        while bit:
+            nxt = ci + bit
+            if nxt <= len(self._chunks) and self._tree[nxt] <= index:
+                ci = nxt
+                index -= self._tree[nxt]
+            bit >>= 1
+        return ci, index
+
+    def _split(self, ci: int) -> None:
+        chunk = self._chunks[ci]
+        if len(chunk) > self._load * 2:
+            self._chunks[ci:ci + 1] = [chunk[:self._load], chunk[self._load:]]
+            self._dirty = True
+
+    def _drop_if_empty(self, ci: int) -> None:
+        if not self._chunks[ci]:
+            del self._chunks[ci]
+            self._dirty = True
+
+    def iter_from(self, start: int, count: int | None = None) -> Iterator[Any]:
+        """Iterates from position ``start`` without materializing the prefix."""
+        if start >= self._len or count == 0:
+            return iter(())
+        ci, offset = self._locate(max(start, 0))
+        items = chain(
+            islice(self._chunks[ci], offset, None),
+            chain.from_iterable(self._chunks[ci + 1:]),
+        )
+        return items if count is None else islice(items, count)
+
+    def append(self, value: Any) -> None:
+        if not self._chunks:
+            self._chunks.append([value])
+            self._dirty = True
+        else:
+            self._chunks[-1].append(value)
+            self._update(len(self._chunks) - 1, 1)
+            self._split(len(self._chunks) - 1)
+        self._len += 1
+
+    def appendleft(self, value: Any) -> None:
+        self.insert(0, value)
+
+    def extend(self, iterable: Iterable[Any]) -> None:
+        items = list(iterable)
+        if not items:
+            return
+        self._len += len(items)
+
+        if self._chunks:
+            room = max(self._load - len(self._chunks[-1]), 0)
+            self._chunks[-1].extend(items[:room])
+            items = items[room:]
+        for i in range(0, len(items), self._load):
+            self._chunks.append(items[i:i + self._load])
+        self._dirty = True
+
+    def insert(self, index: int, value: Any) -> None:
+        """Inserts before ``index``, clamping out-of-range positions like :meth:`list.insert`."""
+        if index < 0:
+            index = max(index + self._len, 0)
+        if index >= self._len:
+            self.append(value)
+            return
+
+        ci, offset = self._locate(index)
+        self._chunks[ci].insert(offset, value)
+        self._len += 1
+        self._update(ci, 1)
+        self._split(ci)
+
+    def pop(self, index: int = -1) -> Any:
+        if not self._len:
+            raise IndexError("pop from empty ChunkedList")
+        ci, offset = self._locate(index)
+        value = self._chunks[ci].pop(offset)
+        self._len -= 1
+        self._update(ci, -1)
+        self._drop_if_empty(ci)
+        return value
+
+    def popleft(self) -> Any:
+        return self.pop(0)
+
+    def move(self, source: int, destination: int) -> None:
+        """Moves the item at ``source`` so that it ends up at ``destination``."""
+        self.insert(destination, self.pop(source))
+
+    def delete_range(self, start: int, stop: int) -> None:
+        """Deletes positions ``start`` to ``stop`` (exclusive), dropping whole chunks at once."""
+        start, stop = max(start, 0), min(stop, self._len)
+        if start >= stop:
+            return
+
+        ci, offset = self._locate(start)
+        remaining = stop - start
+        while remaining:
+            chunk = self._chunks[ci]
+            if offset == 0 and len(chunk) <= remaining:
+                remaining -= len(chunk)
+                del self._chunks[ci]
+                continue
+            taken = min(len(chunk) - offset, remaining)
+            del chunk[offset:offset + taken]
+            remaining -= taken
+            ci, offset = ci + 1, 0
+
+        self._len -= stop - start
+        self._dirty = True
+
+    def clear(self) -> None:
+        self._chunks = []
+        self._tree = []
+        self._len = 0
+        self._dirty = False
@@ -0,0 +1,67 @@
+from __future__ import annotations
+
+import aiohttp
+
+import config
+
+__all__ = ("HTTP",)
+
+
+class HTTP:
+    """The process-wide pooled HTTP session.
+
+    Everything that talks to external HTTP APIs (Spotify, Lavalink REST
+    probes) shares this session, so connections are kept alive and reused
+    instead of every client opening its own pool.
+    """
+
+    _session: aiohttp.ClientSession | None = None
+    requests = 0
+    connections_created = 0
+    connections_reused = 0
+
+    @classmethod
+    def session(cls) -> aiohttp.ClientSession:
+        if cls._session is None or cls._session.closed:
+            trace = aiohttp.TraceConfig()
+            trace.on_request_start.append(cls._on_request_start)
+            trace.on_connection_create_end.append(cls._on_connection_create)
+            trace.on_connection_reuseconn.append(cls._on_connection_reuse)
+
+            cls._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(
+                    limit=config.HTTP_POOL_SIZE,
+                    keepalive_timeout=config.HTTP_KEEPALIVE,
+                ),
+                trace_configs=[trace],
+            )
+        return cls._session
+
+    @classmethod
+    async def close(cls) -> None:
+        if cls._session is not None:
+            await cls._session.close()
+            cls._session = None
+
+    @classmethod
+    def stats(cls) -> dict[str, int | float]:
+        connections = cls.connections_created + cls.connections_reused
+        return {
+            "pool_size": config.HTTP_POOL_SIZE,
+            "requests": cls.requests,
+            "connections_created": cls.connections_created,
+            "connections_reused": cls.connections_reused,
+            "reuse_ratio": cls.connections_reused / connections if connections else 0.0,
+        }
+
+    @classmethod
+    async def _on_request_start(cls, session, context, params) -> None:
+        cls.requests += 1
+
+    @classmethod
+    async def _on_connection_create(cls, session, context, params) -> None:
+        cls.connections_created += 1
+
+    @classmethod
+    async def _on_connection_reuse(cls, session, context, params) -> None:
+        cls.connections_reused += 1
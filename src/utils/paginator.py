@@ -1,16 +1,21 @@
 from __future__ import annotations
 
-from typing import List
+import os
+from collections import OrderedDict
+from typing import List, Protocol, runtime_checkable
 
 import discord
 from discord.ext.commands import Context
 
+from .attachments import AttachmentCache, attachment_cache as shared_attachment_cache
+
 __all__ = (
     "PaginatorButton",
     "Paginator",
     "PageGroup",
     "PaginatorMenu",
     "Page",
+    "PageSource",
 )
 
 
@@ -107,6 +112,8 @@ class Page:
         A list of local files to be shown with the page.
     custom_view: Optional[:class:`discord.ui.View`]
         The custom view shown when the page is visible. Overrides the `custom_view` attribute of the main paginator.
+    attachment_cache: Optional[:class:`~utils.attachments.AttachmentCache`]
+        Where the contents of ``files`` are kept. Defaults to the shared cache.
     """
 
     def __init__(
@@ -115,6 +122,7 @@ class Page:
         embeds: list[list[discord.Embed] | discord.Embed] | None = None,
         custom_view: discord.ui.View | None = None,
         files: list[discord.File] | None = None,
+        attachment_cache: AttachmentCache | None = None,
         **kwargs,
     ):
         if content is None and embeds is None:
@@ -125,6 +133,9 @@ class Page:
         self._embeds = embeds or []
         self._custom_view = custom_view
         self._files = files or []
+        self._paths: set[str] = set()
+        self.attachment_cache = attachment_cache if attachment_cache is not None else shared_attachment_cache
+        self._payload: dict | None = None
 
     async def callback(self, interaction: discord.Interaction | None = None):
         """|coro|
@@ -136,15 +147,40 @@ class Page:
         """
 
     def update_files(self) -> list[discord.File] | None:
-        """Updates :class:`discord.File` objects so that they can be sent multiple
-        times. This is called internally each time the page is sent.
+        """Returns :class:`discord.File` objects for the page's files that can be sent.
+        This is called internally each time the page is sent.
+
+        Files on disk are read once into the page's :class:`~utils.attachments.AttachmentCache`
+        and every send gets a new file over the shared contents; the page's own
+        file is closed after the first read. Other files are rewound and sent as is.
         """
+        files = []
         for file in self._files:
-            if file.fp.closed and (fn := getattr(file.fp, "name", None)):
-                file.fp = open(fn, "rb")
-            file.reset()
-            file.fp.close = lambda: None
-        return self._files
+            path = getattr(file.fp, "name", None)
+            if isinstance(path, str) and (path in self._paths or os.path.isfile(path)):
+                if path not in self._paths:
+                    self._paths.add(path)
+                    file.close()
+                files.append(
+                    discord.File(
+                        self.attachment_cache.open(path),
+                        filename=file.filename,
+                        spoiler=file.spoiler,
+                        description=file.description,
+                    )
+                )
+            else:
+                file.reset()
+                files.append(file)
+        return files
+
+    @property
+    def payload(self) -> dict:
+        """Gets the content and embeds of the page as keyword arguments for sending
+        or editing a message. Built on first use and again after either is set."""
+        if self._payload is None:
+            self._payload = {"content": self._content, "embeds": self._embeds}
+        return self._payload
 
     @property
     def content(self) -> str | None:
@@ -155,6 +191,7 @@ class Page:
     def content(self, value: str | None):
         """Sets the content for the page."""
         self._content = value
+        self._payload = None
 
     @property
     def embeds(self) -> list[list[discord.Embed] | discord.Embed] | None:
@@ -165,6 +202,7 @@ class Page:
     def embeds(self, value: list[list[discord.Embed] | discord.Embed] | None):
         """Sets the embeds for the page."""
         self._embeds = value
+        self._payload = None
 
     @property
     def custom_view(self) -> discord.ui.View | None:
@@ -185,6 +223,7 @@ class Page:
     def files(self, value: list[discord.File] | None):
         """Sets the files associated with the page."""
         self._files = value
+        self._paths = set()
 
 
 class PageGroup:
@@ -270,14 +309,40 @@ class PageGroup:
         self.trigger_on_display = trigger_on_display
 
 
+@runtime_checkable
+class PageSource(Protocol):
+    """A source of pages that are only built when the paginator shows them.
+    Pass one as ``pages`` to :class:`Paginator` instead of a prebuilt list
+    when building every page up front would be expensive.
+
+    Sources whose pages change over time may also define
+    ``get_page_key(page_number)``, returning a hashable value that changes
+    whenever the content of that page does. A rendered page is reused only
+    while its key stays the same.
+    """
+
+    def get_page_count(self) -> int:
+        """Returns the total number of pages."""
+        ...
+
+    async def get_page(
+        self, page_number: int
+    ) -> Page | str | discord.Embed | list[discord.Embed]:
+        """|coro|
+        Returns the content of the zero-indexed page ``page_number``.
+        """
+        ...
+
+
 class Paginator(discord.ui.View):
     """Creates a paginator which can be sent as a message and uses buttons for navigation.
     Parameters
     ----------
-    pages: Union[List[:class:`PageGroup`], List[:class:`Page`], List[:class:`str`], List[Union[List[:class:`discord.Embed`], :class:`discord.Embed`]]]
+    pages: Union[List[:class:`PageGroup`], List[:class:`Page`], List[:class:`str`], List[Union[List[:class:`discord.Embed`], :class:`discord.Embed`]], :class:`PageSource`]
         The list of :class:`PageGroup` objects, :class:`Page` objects, strings, embeds, or list of embeds to paginate.
         If a list of :class:`PageGroup` objects is provided and `show_menu` is ``False``,
         only the first page group will be displayed.
+        A :class:`PageSource` is asked for each page only when it is displayed.
     show_disabled: :class:`bool`
         Whether to show disabled buttons.
     show_indicator: :class:`bool`
@@ -309,6 +374,13 @@ class Paginator(discord.ui.View):
     trigger_on_display: :class:`bool`
         Whether to automatically trigger the callback associated with a `Page` whenever it is displayed.
         Has no effect if no callback exists for a `Page`.
+    page_cache_size: :class:`int`
+        How many pages rendered from a :class:`PageSource` are kept for revisiting.
+    custom_id_prefix: Optional[:class:`str`]
+        Makes the paginator stateless. Every button's custom_id becomes
+        ``<custom_id_prefix>:<button_type>:<page>`` and the view is never registered, so
+        nothing is kept per message and it does not time out. Clicks have to be passed to
+        :meth:`dispatch` of a paginator built the same way. Cannot be used with ``show_menu``.
     Attributes
     ----------
     menu: Optional[List[:class:`PaginatorMenu`]]
@@ -337,6 +409,7 @@ class Paginator(discord.ui.View):
             | list[Page]
             | list[str]
             | list[list[discord.Embed] | discord.Embed]
+            | PageSource
         ),
         show_disabled: bool = True,
         show_indicator=True,
@@ -351,15 +424,28 @@ class Paginator(discord.ui.View):
         timeout: float | None = 180.0,
         custom_buttons: list[PaginatorButton] | None = None,
         trigger_on_display: bool | None = None,
+        page_cache_size: int = 5,
+        custom_id_prefix: str | None = None,
     ) -> None:
         super().__init__(timeout=timeout)
+        if custom_id_prefix is not None:
+            if show_menu:
+                raise ValueError("stateless paginators cannot show a page group menu.")
+            # A finished view is not stored by discord.py when it is sent
+            self.stop()
+        self.custom_id_prefix = custom_id_prefix
         self.timeout: float = timeout
         self.pages: (
             list[PageGroup]
             | list[str]
             | list[Page]
             | list[list[discord.Embed] | discord.Embed]
+            | PageSource
         ) = pages
+        self.source: PageSource | None = pages if isinstance(pages, PageSource) else None
+        self.page_cache_size = page_cache_size
+        self.rendered_pages: OrderedDict[int, tuple[object, Page]] = OrderedDict()
+        self.page_objects: dict[int, tuple[object, Page]] = {}
         self.current_page = 0
         self.menu: PaginatorMenu | None = None
         self.show_menu = show_menu
@@ -367,7 +453,7 @@ class Paginator(discord.ui.View):
         self.page_groups: list[PageGroup] | None = None
         self.default_page_group: int = 0
 
-        if all(isinstance(pg, PageGroup) for pg in pages):
+        if self.source is None and all(isinstance(pg, PageGroup) for pg in pages):
             self.page_groups = self.pages if show_menu else None
             if sum(pg.default is True for pg in self.page_groups) > 1:
                 raise ValueError("Only one PageGroup can be set as the default.")
@@ -379,7 +465,7 @@ class Paginator(discord.ui.View):
                 self.page_groups[self.default_page_group]
             )
 
-        self.page_count = max(len(self.pages) - 1, 0)
+        self.page_count = self.count_pages()
         self.buttons = {}
         self.custom_buttons: list = custom_buttons
         self.show_disabled = show_disabled
@@ -412,6 +498,7 @@ class Paginator(discord.ui.View):
             | list[Page]
             | list[str]
             | list[list[discord.Embed] | discord.Embed]
+            | PageSource
         ) = None,
         show_disabled: bool | None = None,
         show_indicator: bool | None = None,
@@ -474,9 +561,14 @@ class Paginator(discord.ui.View):
             | list[str]
             | list[Page]
             | list[list[discord.Embed] | discord.Embed]
+            | PageSource
         ) = (pages if pages is not None else self.pages)
+        if pages is not None:
+            self.source = pages if isinstance(pages, PageSource) else None
+            self.rendered_pages.clear()
+            self.page_objects.clear()
         self.show_menu = show_menu if show_menu is not None else self.show_menu
-        if pages is not None and all(isinstance(pg, PageGroup) for pg in pages):
+        if self.source is None and pages is not None and all(isinstance(pg, PageGroup) for pg in pages):
             self.page_groups = self.pages if self.show_menu else None
             if sum(pg.default is True for pg in self.page_groups) > 1:
                 raise ValueError("Only one PageGroup can be set as the default.")
@@ -487,7 +579,7 @@ class Paginator(discord.ui.View):
             self.pages: list[Page] = self.get_page_group_content(
                 self.page_groups[self.default_page_group]
             )
-        self.page_count = max(len(self.pages) - 1, 0)
+        self.page_count = self.count_pages()
         self.current_page = 0
         # Apply config changes, if specified
         self.show_disabled = (
@@ -538,8 +630,7 @@ class Paginator(discord.ui.View):
         if self.disable_on_timeout:
             for item in self.children:
                 item.disabled = True
-            page = self.pages[self.current_page]
-            page = self.get_page_content(page)
+            page = await self.get_page(self.current_page)
             files = page.update_files()
             await self.message.edit(
                 view=self,
@@ -569,8 +660,7 @@ class Paginator(discord.ui.View):
                 item.disabled = True
         if page:
             await self.message.edit(
-                content=page.content,
-                embeds=page.embeds,
+                **page.payload,
                 view=self,
             )
         else:
@@ -600,8 +690,7 @@ class Paginator(discord.ui.View):
                 self.remove_item(item)
         if page:
             await self.message.edit(
-                content=page.content,
-                embeds=page.embeds,
+                **page.payload,
                 view=self,
             )
         else:
@@ -626,15 +715,19 @@ class Paginator(discord.ui.View):
         :class:`~discord.Message`
             The message associated with the paginator.
         """
-        self.update_buttons()
+        if self.source is not None:
+            # The source may have grown or shrunk since the last page was shown
+            self.page_count = self.count_pages()
+            page_number = min(page_number, self.page_count)
+
         self.current_page = page_number
+        self.update_buttons()
         if self.show_indicator:
             self.buttons["page_indicator"][
                 "object"
             ].label = f"{self.current_page + 1}/{self.page_count + 1}"
 
-        page = self.pages[page_number]
-        page = self.get_page_content(page)
+        page = await self.get_page(page_number)
 
         if page.custom_view:
             self.update_custom_view(page.custom_view)
@@ -645,15 +738,13 @@ class Paginator(discord.ui.View):
             await interaction.response.defer()  # needed to force webhook message edit route for files kwarg support
             await interaction.followup.edit_message(
                 message_id=self.message.id,
-                content=page.content,
-                embeds=page.embeds,
+                **page.payload,
                 attachments=files or [],
                 view=self,
             )
         else:
             await self.message.edit(
-                content=page.content,
-                embeds=page.embeds,
+                **page.payload,
                 attachments=files or [],
                 view=self,
             )
@@ -808,6 +899,9 @@ class Paginator(discord.ui.View):
         if self.show_menu:
             self.add_menu()
 
+        if self.custom_id_prefix is not None:
+            self.update_custom_ids()
+
         # We're done adding standard buttons and menus, so we can now add any specified custom view items below them
         # The bot developer should handle row assignments for their view before passing it to Paginator
         if self.custom_view:
@@ -815,6 +909,50 @@ class Paginator(discord.ui.View):
 
         return self.buttons
 
+    def update_custom_ids(self):
+        """Points the custom_id of every button of a stateless paginator at the page it leads to."""
+        targets = {
+            "first": 0,
+            "prev": self.page_count if self.current_page <= 0 else self.current_page - 1,
+            "next": 0 if self.current_page >= self.page_count else self.current_page + 1,
+            "last": self.page_count,
+        }
+        for key, button in self.buttons.items():
+            page_number = targets.get(key, self.current_page)
+            button["object"].custom_id = f"{self.custom_id_prefix}:{key}:{page_number}"
+
+    def parse_custom_id(self, custom_id: str) -> int | None:
+        """Returns the page a button of a stateless paginator with the same
+        ``custom_id_prefix`` leads to, or ``None`` if ``custom_id`` is not one of them."""
+        if self.custom_id_prefix is None or not custom_id.startswith(f"{self.custom_id_prefix}:"):
+            return None
+        button_type, _, page_number = custom_id[len(self.custom_id_prefix) + 1:].partition(":")
+        if button_type not in self.buttons or not page_number.isdigit():
+            return None
+        return int(page_number)
+
+    async def dispatch(self, interaction: discord.Interaction) -> bool:
+        """Handles a click on a button of a stateless paginator by showing the page
+        it leads to on the message it was clicked on.
+        Parameters
+        ----------
+        interaction: :class:`discord.Interaction`
+            The interaction created by clicking the button.
+        Returns
+        -------
+        :class:`bool`
+            Whether the button belonged to this paginator.
+        """
+        page_number = self.parse_custom_id(interaction.data.get("custom_id", ""))
+        if page_number is None:
+            return False
+
+        self.message = interaction.message
+        self.user = interaction.user
+        self.page_count = self.count_pages()
+        await self.goto_page(min(page_number, self.page_count), interaction=interaction)
+        return True
+
     def update_custom_view(self, custom_view: discord.ui.View):
         """Updates the custom view shown on the paginator."""
         if isinstance(self.custom_view, discord.ui.View):
@@ -823,6 +961,64 @@ class Paginator(discord.ui.View):
         for item in custom_view.children:
             self.add_item(item)
 
+    def count_pages(self) -> int:
+        """Returns the zero-indexed number of the last page."""
+        if self.source is not None:
+            return max(self.source.get_page_count() - 1, 0)
+        return max(len(self.pages) - 1, 0)
+
+    async def get_page(self, page_number: int) -> Page:
+        """Returns the :class:`Page` for the given page number. Pages of a
+        :class:`PageSource` are rendered on first use and the most recently
+        used ones are kept.
+        Parameters
+        ----------
+        page_number: :class:`int`
+            The zero-indexed page to return.
+        """
+        if self.source is None:
+            # Each page is converted once, and again only if it was replaced
+            page = self.pages[page_number]
+            converted = self.page_objects.get(page_number)
+            if converted is None or converted[0] is not page:
+                converted = (page, self.get_page_content(page))
+                self.page_objects[page_number] = converted
+            return converted[1]
+
+        key = self.get_page_key(page_number)
+        rendered = self.rendered_pages.get(page_number)
+        if rendered is not None and rendered[0] == key:
+            self.rendered_pages.move_to_end(page_number)
+            return rendered[1]
+
+        page = self.get_page_content(await self.source.get_page(page_number))
+        self.rendered_pages[page_number] = (key, page)
+        self.rendered_pages.move_to_end(page_number)
+        while len(self.rendered_pages) > self.page_cache_size:
+            self.rendered_pages.popitem(last=False)
+        return page
+
+    def get_page_key(self, page_number: int) -> object:
+        get_page_key = getattr(self.source, "get_page_key", None)
+        return get_page_key(page_number) if get_page_key is not None else None
+
+    async def refresh(self) -> None:
+        """Shows the current page again if the :class:`PageSource` reports that it
+        or the number of pages changed. Nothing is rendered or edited otherwise."""
+        if self.source is None or self.message is None:
+            return
+        if self.custom_id_prefix is None and self.is_finished():
+            return
+
+        rendered = self.rendered_pages.get(self.current_page)
+        if (
+            rendered is not None
+            and rendered[0] == self.get_page_key(self.current_page)
+            and self.page_count == self.count_pages()
+        ):
+            return
+        await self.goto_page(self.current_page)
+
     def get_page_group_content(self, page_group: PageGroup) -> list[Page]:
         """Returns a converted list of `Page` objects for the given page group based on the content of its pages."""
         return [self.get_page_content(page) for page in page_group.pages]
@@ -860,10 +1056,9 @@ class Paginator(discord.ui.View):
         interaction: Optional[:class:`discord.Interaction`]
             The interaction that was used to trigger the page action.
         """
-        if self.get_page_content(self.pages[self.current_page]).callback:
-            await self.get_page_content(self.pages[self.current_page]).callback(
-                interaction=interaction
-            )
+        page = await self.get_page(self.current_page)
+        if page.callback:
+            await page.callback(interaction=interaction)
 
     async def send(
         self,
@@ -933,8 +1128,7 @@ class Paginator(discord.ui.View):
             raise TypeError(f"expected bool not {mention_author.__class__!r}")
 
         self.update_buttons()
-        page = self.pages[self.current_page]
-        page_content = self.get_page_content(page)
+        page_content = await self.get_page(self.current_page)
 
         if page_content.custom_view:
             self.update_custom_view(page_content.custom_view)
@@ -952,9 +1146,8 @@ class Paginator(discord.ui.View):
             ctx = target
 
         self.message = await ctx.send(
-            content=page_content.content,
-            embeds=page_content.embeds,
-            files=page_content.files,
+            **page_content.payload,
+            files=page_content.update_files(),
             view=self,
             reference=reference,
             allowed_mentions=allowed_mentions,
@@ -1002,10 +1195,7 @@ class Paginator(discord.ui.View):
 
         self.update_buttons()
 
-        page: Page | str | discord.Embed | list[discord.Embed] = self.pages[
-            self.current_page
-        ]
-        page_content: Page = self.get_page_content(page)
+        page_content: Page = await self.get_page(self.current_page)
 
         if page_content.custom_view:
             self.update_custom_view(page_content.custom_view)
@@ -1014,9 +1204,8 @@ class Paginator(discord.ui.View):
 
         try:
             self.message = await message.edit(
-                content=page_content.content,
-                embeds=page_content.embeds,
-                files=page_content.files,
+                **page_content.payload,
+                files=page_content.update_files(),
                 attachments=[],
                 view=self,
                 suppress=suppress,
@@ -1074,10 +1263,7 @@ class Paginator(discord.ui.View):
 
         self.update_buttons()
 
-        page: Page | str | discord.Embed | list[discord.Embed] = self.pages[
-            self.current_page
-        ]
-        page_content: Page = self.get_page_content(page)
+        page_content: Page = await self.get_page(self.current_page)
 
         if page_content.custom_view:
             self.update_custom_view(page_content.custom_view)
@@ -1090,16 +1276,14 @@ class Paginator(discord.ui.View):
                     target_message, ephemeral=ephemeral
                 )
                 msg = await target.send(
-                    content=page_content.content,
-                    embeds=page_content.embeds,
-                    files=page_content.files,
+                    **page_content.payload,
+                    files=page_content.update_files(),
                     view=self,
                 )
             elif interaction.response.is_done():
                 msg = await interaction.followup.send(
-                    content=page_content.content,
-                    embeds=page_content.embeds,
-                    files=page_content.files,
+                    **page_content.payload,
+                    files=page_content.update_files(),
                     view=self,
                     ephemeral=ephemeral,
                 )
@@ -1109,9 +1293,8 @@ class Paginator(discord.ui.View):
                     msg = await msg.channel.fetch_message(msg.id)
             else:
                 await interaction.response.send_message(
-                    content=page_content.content,
-                    embeds=page_content.embeds,
-                    files=page_content.files,
+                    **page_content.payload,
+                    files=page_content.update_files(),
                     view=self,
                     ephemeral=ephemeral,
                 )
@@ -1122,16 +1305,14 @@ class Paginator(discord.ui.View):
             if target:
                 await ctx.respond(target_message, ephemeral=ephemeral)
                 msg = await ctx.send(
-                    content=page_content.content,
-                    embeds=page_content.embeds,
-                    files=page_content.files,
+                    **page_content.payload,
+                    files=page_content.update_files(),
                     view=self,
                 )
             else:
                 msg = await ctx.respond(
-                    content=page_content.content,
-                    embeds=page_content.embeds,
-                    files=page_content.files,
+                    **page_content.payload,
+                    files=page_content.update_files(),
                     view=self,
                 )
         if isinstance(msg, (discord.Message, discord.WebhookMessage)):
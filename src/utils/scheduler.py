@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Any, Callable
+
+import discord
+
+from utils.logger import logger
+
+__all__ = ("EditScheduler",)
+
+
+class EditScheduler:
+    """Coalesces edits of a single message.
+
+    Callers only mark the message as stale with :meth:`request`. One worker
+    task renders the latest state and edits the message, at most once per
+    ``interval`` seconds, so a burst of updates turns into a single edit.
+    Edits whose rendered payload equals the last one sent are skipped.
+
+    Parameters
+    ----------
+    render: Callable[[], Dict[:class:`str`, Any]]
+        Builds the keyword arguments for :meth:`discord.Message.edit`.
+    interval: :class:`float`
+        Minimum number of seconds between two edits.
+    """
+
+    def __init__(self, render: Callable[[], dict[str, Any]], interval: float = 1.0) -> None:
+        self.render = render
+        self.interval = interval
+        self.message: discord.Message | discord.WebhookMessage | None = None
+        self.edits = 0
+        self.skipped = 0
+        self._dirty = False
+        self._task: asyncio.Task | None = None
+        self._last_edit = 0.0
+        self._last_payload: dict[str, Any] | None = None
+
+    @staticmethod
+    def fingerprint(payload: dict[str, Any]) -> dict[str, Any]:
+        """Returns a comparable snapshot of an edit payload."""
+        result = {}
+        for key, value in payload.items():
+            if isinstance(value, discord.Embed):
+                value = value.to_dict()
+            elif isinstance(value, discord.ui.View):
+                value = value.to_components()
+            result[key] = value
+        return result
+
+    def sent(self, message: discord.Message | discord.WebhookMessage, payload: dict[str, Any]) -> None:
+        """Records a message that was sent or edited outside of the scheduler."""
+        self.message = message
+        self._last_payload = self.fingerprint(payload)
+        self._last_edit = time.monotonic()
+
+    def request(self) -> asyncio.Task:
+        """Marks the message as stale and makes sure an edit is scheduled."""
+        self._dirty = True
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def flush(self) -> None:
+        """Waits until the pending edit, if any, has been sent."""
+        if self._task is not None and not self._task.done():
+            await asyncio.shield(self._task)
+
+    def cancel(self) -> None:
+        self._dirty = False
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _run(self) -> None:
+        while self._dirty:
+            delay = self._last_edit + self.interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            self._dirty = False
+            if self.message is None:
+                return
+
+            payload = self.render()
+            snapshot = self.fingerprint(payload)
+            if snapshot == self._last_payload:
+                self.skipped += 1
+                continue
+
+            try:
+                await self.message.edit(**payload)
+            except discord.NotFound:
+                self.message = None
+                return
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to edit message: {e}")
+            else:
+                self._last_payload = snapshot
+                self.edits += 1
+            finally:
+                self._last_edit = time.monotonic()
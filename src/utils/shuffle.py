@@ -0,0 +1,64 @@
+from __future__ import annotations
+
+import random
+from typing import Iterator
+
+__all__ = ("LazyShuffle",)
+
+
+class LazyShuffle:
+    """A seeded Fisher-Yates shuffle of the integers in ``[start, stop)`` that
+    only draws the next value when it is asked for.
+
+    Creating one is ``O(1)`` and each draw is ``O(1)``; the only state kept is
+    a dictionary of swapped positions, which is at most as large as the number
+    of draws so far. Values can be appended to the pool while it is in use.
+
+    Parameters
+    ----------
+    start: :class:`int`
+        First value of the range.
+    stop: :class:`int`
+        End of the range (exclusive).
+    seed: Optional[:class:`int`]
+        Seed for the permutation. A random one is picked if not provided.
+    """
+
+    def __init__(self, start: int, stop: int, seed: int | None = None) -> None:
+        self.start = start
+        self.size = max(stop - start, 0)
+        self.drawn = 0
+        self.seed = seed if seed is not None else random.randrange(2**32)
+        self._random = random.Random(self.seed)
+        self._swaps: dict[int, int] = {}
+
+    @property
+    def remaining(self) -> int:
+        return self.size - self.drawn
+
+    def _value(self, position: int) -> int:
+        return self._swaps.get(position, self.start + position)
+
+    def draw(self) -> int:
+        """Returns the next value of the permutation."""
+        if not self.remaining:
+            raise IndexError("draw from exhausted LazyShuffle")
+
+        j = self._random.randrange(self.drawn, self.size)
+        value = self._value(j)
+        if j != self.drawn:
+            self._swaps[j] = self._value(self.drawn)
+        self._swaps.pop(self.drawn, None)
+        self.drawn += 1
+        return value
+
+    def push(self, value: int) -> None:
+        """Adds ``value`` to the values that are still to be drawn."""
+        if value != self.start + self.size:
+            self._swaps[self.size] = value
+        self.size += 1
+
+    def remaining_values(self) -> Iterator[int]:
+        """Yields the values that are still to be drawn, in no particular order."""
+        for position in range(self.drawn, self.size):
+            yield self._value(position)